@@ -1,22 +1,22 @@
 import typer
 import logging
-from rich.logging import RichHandler
 
 logger = logging.getLogger(__name__)
 from enum import Enum
 from pathlib import Path
 from typing import Optional
-from speech_translator.orchestrator import TranslationOrchestrator
-from speech_translator.config import Config
-from speech_translator.core.gemini import GeminiClient
+from speech_translator.config import Config, VIDEO_EXTENSIONS
+
 
 # Create Enum for modes
 class TranslationMode(str, Enum):
     MONOLOGUE = "monologue"
     DIALOGUE = "dialogue"
 
+
 app = typer.Typer(help="Speech-to-Speech Translator using Gemini models")
 
+
 @app.command()
 def translate(
     input_path: str = typer.Argument(..., help="Path to the input audio/video file OR a YouTube URL."),
@@ -32,6 +32,10 @@ def translate(
     If a video file is provided, the audio track will be extracted and translated.
     If the output path is not specified, it defaults to the input filename with _translated suffix.
     """
+    # Heavy imports (pydub, numpy, google-genai, yt-dlp) are deferred so --help stays fast
+    from rich.logging import RichHandler
+    from speech_translator.orchestrator import TranslationOrchestrator
+
     # Setup Logging
     log_level = logging.INFO if verbose else logging.WARNING
     logging.basicConfig(
@@ -54,10 +58,8 @@ def translate(
         if output_path is None:
             # Check if input looks like a video (URL or extension)
             is_video_input = False
-            input_lower = input_path.lower()
-            video_extensions = [".mp4", ".mov", ".mkv", ".avi", ".webm"]
             
-            if input_lower.startswith("http://") or input_lower.startswith("https://"):
+            if input_path[:8].lower().startswith(("http://", "https://")):
                 # Assume URLs (YouTube) are videos by default unless proven otherwise
                 is_video_input = True
                 # Default to "downloaded_video" for URLs since filename inference
@@ -65,7 +67,7 @@ def translate(
                 base_name = "downloaded_video"
             else:
                 input_p = Path(input_path)
-                if input_p.suffix.lower() in video_extensions:
+                if input_p.suffix.lower() in VIDEO_EXTENSIONS:
                     is_video_input = True
                 base_name = input_p.stem
 
@@ -94,14 +96,17 @@ def translate(
             logger.exception("Traceback:")
         raise typer.Exit(code=1)
 
+
 @app.command(name="list-models")
 def list_models():
     """
     Lists all available Gemini models.
     """
+    from speech_translator.core.gemini import get_client
+
     try:
         Config.validate()
-        client = GeminiClient()
+        client = get_client()
         models = client.list_models()
         
         typer.secho("Available Gemini Models:", fg=typer.colors.BLUE, bold=True)
@@ -112,5 +117,6 @@ def list_models():
         typer.secho(f"Error listing models: {e}", fg=typer.colors.RED)
         raise typer.Exit(code=1)
 
+
 if __name__ == "__main__":
     app()
@@ -5,6 +5,10 @@ from dotenv import load_dotenv
 # Load environment variables from .env file
 load_dotenv()
 
+# Container extensions treated as video (input to dub, or output to merge into)
+VIDEO_EXTENSIONS = frozenset({".mp4", ".mov", ".mkv", ".avi", ".webm"})
+
+
 class Config:
     GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
     
@@ -13,11 +17,32 @@ class Config:
     TTS_MODEL = os.getenv("TTS_MODEL", "gemini-2.5-pro-preview-tts")
     GEMINI_API_VERSION = os.getenv("GEMINI_API_VERSION", "v1beta")
     TEMP_DIR = Path(os.getenv("TEMP_DIR", "temp_audio"))
+    # Number of chunks translated concurrently (each chunk is two Gemini round-trips)
+    TRANSLATION_CONCURRENCY = int(os.getenv("TRANSLATION_CONCURRENCY", "4"))
+    # Requests per minute allowed per model (0 = no client-side limit)
+    THINKING_RPM = int(os.getenv("THINKING_RPM", "0"))
+    TTS_RPM = int(os.getenv("TTS_RPM", "10"))
+    # Size limit of the on-disk cache of translated chunks (0 disables it)
+    TRANSLATION_CACHE_MB = int(os.getenv("TRANSLATION_CACHE_MB", "256"))
+    # Codec for audio sent to the thinking model: "opus", "mp3" or "original" (no re-encoding)
+    UPLOAD_AUDIO_CODEC = os.getenv("UPLOAD_AUDIO_CODEC", "opus")
+    # Chunks quieter than the whole track's loudness plus this offset (dB) are not sent to Gemini at all
+    SILENT_CHUNK_OFFSET_DB = float(os.getenv("SILENT_CHUNK_OFFSET_DB", "-30"))
+    # ...and so are chunks whose loudest sample stays below the track's loudness plus this offset (dB)
+    SILENT_CHUNK_PEAK_OFFSET_DB = float(os.getenv("SILENT_CHUNK_PEAK_OFFSET_DB", "-25"))
+
+    # Temp dir that ensure_temp_dir() already created
+    _temp_dir_ready = None
     
     @classmethod
     def validate(cls):
         if not cls.GOOGLE_API_KEY:
             raise ValueError("GOOGLE_API_KEY environment variable is not set. Please check your .env file.")
 
-# Ensure temp directory exists
-Config.TEMP_DIR.mkdir(exist_ok=True)
+    @classmethod
+    def ensure_temp_dir(cls) -> Path:
+        """Creates TEMP_DIR on first use instead of at import time."""
+        if cls._temp_dir_ready != cls.TEMP_DIR:
+            cls.TEMP_DIR.mkdir(parents=True, exist_ok=True)
+            cls._temp_dir_ready = cls.TEMP_DIR
+        return cls.TEMP_DIR
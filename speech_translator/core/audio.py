@@ -1,11 +1,122 @@
+import hashlib
+import io
+import json
 import logging
+import math
+import os
+import subprocess
+import numpy as np
+from collections.abc import Mapping
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
 from pydub import AudioSegment
-from pydub.silence import split_on_silence
-from pathlib import Path
-from typing import List, Optional
+from typing import Dict, Iterator, List, Optional, Tuple, Type
+from speech_translator.config import Config
+from speech_translator.core.cache import DiskCache
 
 logger = logging.getLogger(__name__)
 
+# NumPy dtype for each pydub sample width (bytes)
+_SAMPLE_DTYPES: Dict[int, Type[np.signedinteger]] = {1: np.int8, 2: np.int16, 4: np.int32}
+# ffmpeg raw PCM format for each pydub sample width (bytes)
+_PCM_FORMATS = {1: "s8", 2: "s16le", 4: "s32le"}
+# Compact encodings for audio sent to the speech model: (ffmpeg output args, mime type)
+_RECOGNITION_CODECS = {
+    "opus": (["-c:a", "libopus", "-b:a", "16k", "-f", "ogg"], "audio/ogg"),
+    "mp3": (["-c:a", "libmp3lame", "-b:a", "24k", "-f", "mp3"], "audio/mpeg"),
+}
+# Container signatures recognised by AudioProcessor.detect_audio_format (prefix -> format)
+_AUDIO_MAGIC = {b'RIFF': "wav", b'ID3': "mp3", b'OggS': "ogg"}
+# Size limit of the on-disk cache of speech interval boundaries (small JSON entries, LRU-evicted)
+_INTERVALS_CACHE_BYTES = 4 * 1024 * 1024
+
+
+@dataclass
+class AudioBuffer:
+    """
+    NumPy view (frames x channels) over a segment's PCM plus its format.
+    from_pydub() wraps the segment's bytes without copying and memoizes the view on the segment,
+    so every analysis of the same recording (silence detection, dBFS, ducking) shares one buffer.
+    """
+    samples: np.ndarray
+    frame_rate: int
+    channels: int
+    sample_width: int
+
+    @classmethod
+    def from_pydub(cls, segment: AudioSegment) -> "AudioBuffer":
+        cached = getattr(segment, "_audio_buffer", None)
+        if cached is not None:
+            return cached
+        samples = np.frombuffer(segment.raw_data, dtype=_SAMPLE_DTYPES[segment.sample_width])
+        buffer = cls(
+            samples=samples.reshape(-1, segment.channels),
+            frame_rate=segment.frame_rate,
+            channels=segment.channels,
+            sample_width=segment.sample_width
+        )
+        segment._audio_buffer = buffer
+        return buffer
+
+    def to_pydub(self) -> AudioSegment:
+        return AudioSegment(
+            data=self.samples.tobytes(),
+            sample_width=self.sample_width,
+            frame_rate=self.frame_rate,
+            channels=self.channels
+        )
+
+    def slice_ms(self, start_ms: int, end_ms: int) -> "AudioBuffer":
+        """Returns a view (no copy) of the frames between start_ms and end_ms."""
+        start = int(start_ms * self.frame_rate / 1000)
+        end = int(end_ms * self.frame_rate / 1000)
+        return AudioBuffer(self.samples[start:end], self.frame_rate, self.channels, self.sample_width)
+
+    @property
+    def mono(self) -> np.ndarray:
+        """Per-frame samples, averaged across channels when there is more than one."""
+        if self.channels == 1:
+            return self.samples[:, 0]
+        return self.samples.mean(axis=1)
+
+
+class SpeechChunk(Mapping):
+    """
+    Read-only chunk mapping ({'audio', 'start', 'end'}) returned by detect_speech_intervals;
+    the same values are available as attributes.
+    The audio slice is cut from the parent recording on first access instead of up front
+    and kept afterwards, so chunks that have not been processed yet hold no copy of their PCM.
+    """
+    _KEYS = ('audio', 'start', 'end')
+
+    def __init__(self, parent: AudioSegment, start: int, end: int):
+        self._parent = parent
+        self._audio: Optional[AudioSegment] = None
+        self.start = start
+        self.end = end
+
+    @property
+    def audio(self) -> AudioSegment:
+        if self._audio is None:
+            self._audio = AudioProcessor._slice_ms(self._parent, self.start, self.end)
+        return self._audio
+
+    def __getitem__(self, key):
+        if key not in self._KEYS:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __contains__(self, key) -> bool:
+        # Mapping's default would look the value up, slicing the audio
+        return key in self._KEYS
+
+    def __iter__(self):
+        return iter(self._KEYS)
+
+    def __len__(self) -> int:
+        return len(self._KEYS)
+
+
 class AudioProcessor:
     @staticmethod
     def load_audio(path: str) -> AudioSegment:
@@ -16,124 +127,430 @@ class AudioProcessor:
             logger.error(f"Failed to load audio: {e}")
             raise
 
+    @staticmethod
+    def load_audio_stream(url: str, frame_rate: int, channels: int, headers: Optional[dict] = None) -> AudioSegment:
+        """
+        Decodes a remote media URL with ffmpeg straight into 16-bit PCM in memory,
+        so the container is never written to (and read back from) disk.
+        headers are sent with the HTTP request (e.g. yt-dlp's http_headers).
+        """
+        cmd = ["ffmpeg", "-loglevel", "error"]
+        if headers:
+            cmd += ["-headers", "".join(f"{name}: {value}\r\n" for name, value in headers.items())]
+        cmd += [
+            "-i", url,
+            "-vn",
+            "-f", "s16le", "-ar", str(frame_rate), "-ac", str(channels),
+            "pipe:1"
+        ]
+
+        result = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        if result.returncode != 0:
+            raise RuntimeError(f"FFmpeg stream decode failed: {result.stderr.decode('utf-8', errors='replace')}")
+
+        return AudioSegment(data=result.stdout, sample_width=2, frame_rate=frame_rate, channels=channels)
+
     @staticmethod
     def save_audio(segment: AudioSegment, path: str, format: str = "mp3"):
         """Saves an audio segment to path."""
         segment.export(path, format=format)
 
+    @staticmethod
+    def encode_audio(segment: AudioSegment, format: str = "mp3") -> bytes:
+        """Encodes an audio segment in memory and returns the file bytes."""
+        buffer = io.BytesIO()
+        segment.export(buffer, format=format)
+        return buffer.getvalue()
+
+    @staticmethod
+    def detect_audio_format(audio_data: bytes) -> str:
+        """
+        Returns "wav", "mp3", "ogg" or "pcm" from the leading bytes of audio_data.
+        Headerless MP3 is recognised by an MPEG layer III frame header (sync word plus
+        valid version, bitrate and sample rate fields), so raw PCM that merely starts
+        with a 0xFF byte is not mistaken for it.
+        """
+        for magic, fmt in _AUDIO_MAGIC.items():
+            if audio_data.startswith(magic):
+                return fmt
+        if len(audio_data) >= 3 and audio_data[0] == 0xFF:
+            b1, b2 = audio_data[1], audio_data[2]
+            if (b1 & 0xE6) == 0xE2 and (b1 & 0x18) != 0x08 and 0 < (b2 >> 4) < 15 and (b2 & 0x0C) != 0x0C:
+                return "mp3"
+        return "pcm"
+
+    @staticmethod
+    def is_raw_pcm(audio_data: bytes) -> bool:
+        """True unless the bytes start with a WAV (RIFF), MP3 (ID3 / frame header) or Ogg signature."""
+        return AudioProcessor.detect_audio_format(audio_data) == "pcm"
+
+    @staticmethod
+    def load_audio_bytes(audio_data: bytes) -> AudioSegment:
+        """
+        Loads audio bytes that might be Raw PCM (Gemini TTS default) or WAV/MP3/Ogg.
+        Raw PCM is assumed to be 24kHz 16-bit mono ("audio/L16;codec=pcm;rate=24000").
+        """
+        return _AUDIO_LOADERS[AudioProcessor.detect_audio_format(audio_data)](audio_data)
+
+    @staticmethod
+    def _leading_silence_ms(samples: np.ndarray, audio: AudioSegment, silence_threshold: float, chunk_size: int) -> int:
+        """
+        Vectorized pydub.silence.detect_leading_silence over samples (frames x channels, possibly
+        reversed): milliseconds of consecutive chunk_size windows quieter than silence_threshold.
+        Window bounds, zero padding of the last window and the integer RMS follow pydub's
+        slicing and audioop.rms, so the result is the same as the per-window loop.
+        """
+        duration_ms = len(audio)
+        starts_ms = np.arange(0, duration_ms, chunk_size)
+        if len(starts_ms) == 0:
+            return 0
+        ends_ms = np.minimum(starts_ms + chunk_size, duration_ms)
+        frames_per_ms = audio.frame_rate / 1000.0
+        start_frames = (starts_ms * frames_per_ms).astype(np.int64)
+        end_frames = (ends_ms * frames_per_ms).astype(np.int64)
+
+        energy = np.concatenate(([0.0], np.cumsum(np.square(samples, dtype=np.float64).sum(axis=1))))
+        n = len(samples)
+        sums = energy[np.minimum(end_frames, n)] - energy[np.minimum(start_frames, n)]
+        # Frames past the end count as zero padding, as in AudioSegment.__getitem__
+        counts = (end_frames - start_frames) * samples.shape[1]
+
+        rms = np.floor(np.sqrt(np.divide(sums, counts, out=np.zeros_like(sums), where=counts > 0)))
+        thresh_amp = 10 ** (silence_threshold / 20) * audio.max_possible_amplitude
+        silent = rms < thresh_amp
+
+        loud = np.flatnonzero(~silent)
+        windows = loud[0] if len(loud) else len(silent)
+        return int(windows) * chunk_size
+
     @staticmethod
     def trim_silence(audio: AudioSegment, silence_threshold: float = -50.0, chunk_size: int = 10) -> AudioSegment:
-        """Removes silence from the beginning and end of the audio."""
-        def detect_leading_silence(sound, silence_threshold, chunk_size):
-            trim_ms = 0
-            while trim_ms < len(sound) and sound[trim_ms:trim_ms+chunk_size].dBFS < silence_threshold:
-                trim_ms += chunk_size
-            return trim_ms
-
-        start_trim = detect_leading_silence(audio, silence_threshold, chunk_size)
-        end_trim = detect_leading_silence(audio.reverse(), silence_threshold, chunk_size)
+        """
+        Removes silence from the beginning and end of the audio.
+        Both ends are scanned in chunk_size windows with one NumPy pass each,
+        instead of slicing the segment and measuring dBFS window by window.
+        """
+        samples = AudioBuffer.from_pydub(audio).samples
+        start_trim = AudioProcessor._leading_silence_ms(samples, audio, silence_threshold, chunk_size)
+        end_trim = AudioProcessor._leading_silence_ms(samples[::-1], audio, silence_threshold, chunk_size)
         
         duration = len(audio)
         trimmed_sound = audio[start_trim:duration-end_trim]
         return trimmed_sound
 
+    @staticmethod
+    def _dbfs(audio: AudioSegment) -> float:
+        """
+        Loudness of the whole segment in dBFS, computed in one NumPy pass.
+        The result is memoized on the segment so repeated analyzers don't rescan it.
+        """
+        cached = getattr(audio, "_cached_dbfs", None)
+        if cached is not None:
+            return cached
+
+        samples = AudioBuffer.from_pydub(audio).samples
+        rms = np.sqrt(np.mean(samples.astype(np.float64) ** 2)) if len(samples) else 0.0
+        dbfs = 20 * np.log10(rms / audio.max_possible_amplitude) if rms > 0 else -float("inf")
+
+        audio._cached_dbfs = float(dbfs)
+        return audio._cached_dbfs
+
+    @staticmethod
+    def is_silent(audio: AudioSegment, threshold_db: float = -50.0, peak_threshold_db: Optional[float] = None) -> bool:
+        """
+        True if there is nothing worth translating: the whole segment is quieter than threshold_db,
+        or (with peak_threshold_db) not even its loudest sample reaches peak_threshold_db,
+        which catches chunks of steady low-level noise whose average sits above threshold_db.
+        """
+        if AudioProcessor._dbfs(audio) < threshold_db:
+            return True
+        if peak_threshold_db is None:
+            return False
+        samples = AudioBuffer.from_pydub(audio).samples
+        peak = int(np.abs(samples.astype(np.int64)).max()) if samples.size else 0
+        if peak == 0:
+            return True
+        return 20 * np.log10(peak / audio.max_possible_amplitude) < peak_threshold_db
+
+    @staticmethod
+    def _iter_nonsilent(audio: AudioSegment, min_silence_len: int, silence_thresh: float) -> Iterator[List[int]]:
+        """
+        Vectorized replacement for pydub's detect_nonsilent.
+        Computes the RMS of consecutive min_silence_len windows with NumPy and
+        yields the [start, end] ranges (ms) of windows louder than silence_thresh (dBFS).
+        """
+        frame_rate = audio.frame_rate
+        samples = AudioBuffer.from_pydub(audio).mono
+
+        window = max(1, frame_rate * min_silence_len // 1000)
+        if len(samples) == 0:
+            return
+
+        # Per-window RMS in one pass (the last window may be shorter)
+        window_starts = np.arange(0, len(samples), window)
+        squared = samples.astype(np.float64) ** 2
+        sums = np.add.reduceat(squared, window_starts)
+        counts = np.diff(np.append(window_starts, len(samples)))
+        rms = np.sqrt(sums / counts)
+
+        thresh_amp = 10 ** (silence_thresh / 20) * audio.max_possible_amplitude
+        nonsilent_mask = rms > thresh_amp
+
+        # Rising/falling edges of the mask give the start/end window of each run
+        edges = np.flatnonzero(np.diff(np.concatenate(([0], nonsilent_mask.astype(np.int8), [0]))))
+        ms_per_window = 1000 * window / frame_rate
+        duration_ms = len(audio)
+
+        for start, end in zip(edges[0::2], edges[1::2]):
+            yield [int(start * ms_per_window), min(int(end * ms_per_window), duration_ms)]
+
+    @staticmethod
+    def _slice_ms(audio: AudioSegment, start_ms: int, end_ms: int) -> AudioSegment:
+        """Slices audio by milliseconds using frame-aligned byte offsets into the raw data."""
+        frame_width = audio.frame_width
+        bytes_per_ms = audio.frame_rate * frame_width / 1000
+        start = int(start_ms * bytes_per_ms) // frame_width * frame_width
+        end = int(end_ms * bytes_per_ms) // frame_width * frame_width
+        return audio._spawn(audio.raw_data[start:end])
+
+    @staticmethod
+    def _intervals_cache_key(
+        audio: AudioSegment,
+        min_silence_len: int,
+        silence_thresh_offset: int,
+        target_chunk_len_sec: int
+    ) -> str:
+        """
+        Cache entry name for the chunk ranges of this audio and these detection parameters.
+        The whole PCM is hashed: one sha1 pass is cheap next to decoding the file.
+        """
+        hasher = hashlib.sha1(audio.raw_data)
+        hasher.update(
+            f"{audio.frame_rate}|{audio.channels}|{audio.sample_width}|"
+            f"{min_silence_len}|{silence_thresh_offset}|{target_chunk_len_sec}".encode()
+        )
+        return f"{hasher.hexdigest()}.json"
+
+    @staticmethod
+    def _iter_chunk_ranges(
+        audio: AudioSegment,
+        min_silence_len: int,
+        silence_thresh_offset: int,
+        target_chunk_len_sec: int
+    ) -> Iterator[List[int]]:
+        """
+        Yields [start, end] chunks of up to target_chunk_len_sec in a single pass over the nonsilent runs.
+        Only the boundaries of the chunk being built are kept while scanning.
+        """
+        # Adjust silence threshold relative to the audio's dBFS
+        silence_thresh = AudioProcessor._dbfs(audio) + silence_thresh_offset
+        target_len_ms = target_chunk_len_sec * 1000
+
+        # current_end is only meaningful once current_start is set
+        current_start: Optional[int] = None
+        current_end = 0
+
+        for next_start, next_end in AudioProcessor._iter_nonsilent(audio, min_silence_len, silence_thresh):
+            if current_start is None:
+                # Start with the first range
+                current_start, current_end = next_start, next_end
+            elif next_end - current_start < target_len_ms:
+                # Merge: extend current endpoint
+                # (the silence between current_end and next_start is included)
+                current_end = next_end
+            else:
+                # Commit current chunk and start a new one
+                yield [current_start, current_end]
+                current_start, current_end = next_start, next_end
+
+        if current_start is None:
+            logger.warning("No speech detected, returning original audio as single chunk.")
+            yield [0, len(audio)]
+        else:
+            # Append the final chunk
+            yield [current_start, current_end]
+
     @staticmethod
     def detect_speech_intervals(
         audio: AudioSegment, 
         min_silence_len: int = 500, 
         silence_thresh_offset: int = -14, 
         target_chunk_len_sec: int = 300
-    ) -> List[dict]:
+    ) -> List[SpeechChunk]:
         """
         Detects speech intervals and groups them into chunks of approximately chunk_len_sec.
-        Returns a list of dictionaries: {'audio': AudioSegment, 'start': int (ms), 'end': int (ms)}
+        Chunk boundaries are cached on disk, keyed by the audio content and parameters,
+        so re-running the pipeline on the same file skips the scan.
+        Returns a list of SpeechChunk mappings: {'audio': AudioSegment, 'start': int (ms), 'end': int (ms)},
+        where 'audio' is sliced lazily on first access.
         """
-        from pydub.silence import detect_nonsilent
-        
         logger.info("Detecting speech intervals...")
         
-        # Adjust silence threshold relative to the audio's dBFS
-        silence_thresh = audio.dBFS + silence_thresh_offset
-        
-        # detect_nonsilent returns list of [start, end] pairs in ms
-        nonsilent_ranges = detect_nonsilent(
-            audio, 
-            min_silence_len=min_silence_len,
-            silence_thresh=silence_thresh
+        cache = DiskCache(Config.TEMP_DIR / "intervals_cache", max_bytes=_INTERVALS_CACHE_BYTES)
+        cache_name = AudioProcessor._intervals_cache_key(
+            audio, min_silence_len, silence_thresh_offset, target_chunk_len_sec
         )
-
-        if not nonsilent_ranges:
-            logger.warning("No speech detected, returning original audio as single chunk.")
-            return [{'audio': audio, 'start': 0, 'end': len(audio)}]
-
-        combined_chunks = []
-        
-        target_len_ms = target_chunk_len_sec * 1000
+        chunk_ranges = None
+        cached = cache.get(cache_name)
+        if cached is not None:
+            try:
+                chunk_ranges = json.loads(cached)
+                logger.info("Using cached speech intervals.")
+            except ValueError:
+                pass
         
-        # Start with the first range
-        current_start, current_end = nonsilent_ranges[0]
-        
-        for i in range(1, len(nonsilent_ranges)):
-            next_start, next_end = nonsilent_ranges[i]
-            
-            # Calculate potential new length if we merge up to next_end
-            # We include the silence between current_end and next_start
-            potential_len = next_end - current_start
-            
-            if potential_len < target_len_ms:
-                # Merge: extend current endpoint
-                current_end = next_end
-            else:
-                # Commit current chunk
-                chunk_audio = audio[current_start:current_end]
-                combined_chunks.append({
-                    'audio': chunk_audio, 
-                    'start': current_start,
-                    'end': current_end
-                })
-                
-                # Start new chunk
-                current_start = next_start
-                current_end = next_end
+        if chunk_ranges is None:
+            # Drained at once: the cache entry and the caller's chunk count need every range
+            chunk_ranges = list(AudioProcessor._iter_chunk_ranges(
+                audio, min_silence_len, silence_thresh_offset, target_chunk_len_sec
+            ))
+            cache.set(cache_name, json.dumps(chunk_ranges).encode())
         
-        # Append the final chunk
-        chunk_audio = audio[current_start:current_end]
-        combined_chunks.append({
-            'audio': chunk_audio, 
-            'start': current_start,
-            'end': current_end
-        })
+        combined_chunks = [SpeechChunk(audio, start, end) for start, end in chunk_ranges]
         
         logger.info(f"Audio split into {len(combined_chunks)} intervals/chunks.")
         return combined_chunks
 
     @staticmethod
     def merge_segments(segments: List[AudioSegment], crossfade: int = 0) -> AudioSegment:
-        """Merges a list of audio segments into one."""
+        """
+        Merges a list of audio segments into one.
+        Raw PCM is joined in a single buffer instead of repeated pydub appends,
+        which would copy the whole accumulated audio on every step.
+        """
         if not segments:
             return AudioSegment.empty()
         
-        final_audio = segments[0]
+        first = segments[0]
+        params = (first.frame_rate, first.channels, first.sample_width)
+        if any((s.frame_rate, s.channels, s.sample_width) != params for s in segments[1:]):
+            # Mixed formats: let pydub convert them while appending
+            final_audio = first
+            for segment in segments[1:]:
+                final_audio = final_audio.append(segment, crossfade=crossfade)
+            return final_audio
+
+        if crossfade == 0:
+            return first._spawn(b"".join(s.raw_data for s in segments))
+
+        # Only the overlap region goes through pydub's crossfade, the rest is appended to one buffer
+        buffer = bytearray(first.raw_data)
+        tail_bytes = int(crossfade * first.frame_rate / 1000) * first.frame_width
         for segment in segments[1:]:
-            final_audio = final_audio.append(segment, crossfade=crossfade)
+            tail = first._spawn(bytes(buffer[-tail_bytes:]))
+            joined = tail.append(segment, crossfade=crossfade)
+            del buffer[-tail_bytes:]
+            buffer += joined.raw_data
             
-        return final_audio
+        return first._spawn(bytes(buffer))
+
+    @staticmethod
+    def overlay_segments(
+        duration_ms: int,
+        placements: List[Tuple[AudioSegment, int]],
+        like: Optional[AudioSegment] = None
+    ) -> AudioSegment:
+        """
+        Returns duration_ms of silence with every (segment, position_ms) mixed in, like chained
+        AudioSegment.overlay() calls, but written into one NumPy timeline instead of copying
+        the whole track once per segment.
+        As with overlay(), the track takes the highest frame rate, channel count and sample width
+        among the segments, overlapping samples are added with clipping, and audio past the end is cut.
+        If like is given, the track uses its format instead: only the segments are converted,
+        so mixing the result with like (e.g. apply_ducking) needs no whole-track conversion.
+        """
+        if like is not None:
+            frame_rate, channels, sample_width = like.frame_rate, like.channels, like.sample_width
+        else:
+            frame_rate = max((s.frame_rate for s, _ in placements), default=11025)
+            channels = max((s.channels for s, _ in placements), default=1)
+            sample_width = max((s.sample_width for s, _ in placements), default=2)
+        dtype = _SAMPLE_DTYPES[sample_width]
+        info = np.iinfo(dtype)
+
+        total_frames = int(duration_ms * frame_rate / 1000)
+        track = np.zeros((total_frames, channels), dtype=dtype)
+        for segment, position in placements:
+            segment = segment.set_frame_rate(frame_rate).set_channels(channels).set_sample_width(sample_width)
+            samples = AudioBuffer.from_pydub(segment).samples
+            start = int(position * frame_rate / 1000)
+            n = min(len(samples), total_frames - start)
+            if n <= 0:
+                continue
+            # Only the covered region is widened, so memory stays at one track plus one segment
+            region = track[start:start + n]
+            region[:] = np.clip(region.astype(np.int64) + samples[:n], info.min, info.max)
+
+        return AudioSegment(
+            data=track.tobytes(),
+            sample_width=sample_width,
+            frame_rate=frame_rate,
+            channels=channels
+        )
 
     @staticmethod
-    def apply_ducking(original: AudioSegment, voice_over: AudioSegment, threshold_db: int = -15) -> AudioSegment:
+    def _moving_average(values: np.ndarray, window: int) -> np.ndarray:
+        """Centered moving average computed from a cumulative sum (O(n) regardless of window)."""
+        if window <= 1 or len(values) == 0:
+            return values
+        pad = window // 2
+        padded = np.pad(values, (pad, window - 1 - pad), mode="edge")
+        csum = np.concatenate(([0.0], np.cumsum(padded, dtype=np.float64)))
+        return (csum[window:] - csum[:-window]) / window
+
+    @staticmethod
+    def apply_ducking(
+        original: AudioSegment,
+        voice_over: AudioSegment,
+        threshold_db: int = -15,
+        activation_db: float = -45.0,
+        smoothing_ms: int = 50
+    ) -> AudioSegment:
         """
         Overlays the voice_over onto the original audio, ducking (lowering volume) 
         of the original where the voice_over exists.
         
-        Note: This implementation is simple. For 'true' ducking we would track 
-        volume of voice_over over time. Here we assume constant ducking for the duration.
+        The voice_over acts as a sidechain: wherever its envelope is above activation_db
+        the original is attenuated by threshold_db, with smoothing_ms attack/release ramps.
         """
-        # Strategy: "Simple Ducking"
-        # Reduce the volume of the original track by the threshold for the entire duration.
-        # This avoids complex masking while ensuring the voice-over is clearly audible.
+        # Bring the voice to the original's format so samples line up one to one
+        # (no-op when it was built with overlay_segments(..., like=original))
+        voice_over = voice_over.set_frame_rate(original.frame_rate) \
+            .set_channels(original.channels) \
+            .set_sample_width(original.sample_width)
+
+        dtype = _SAMPLE_DTYPES[original.sample_width]
+        orig = AudioBuffer.from_pydub(original).samples
+        voice = AudioBuffer.from_pydub(voice_over).samples
+
+        # Like overlay(), the result keeps the original's length
+        voice_mix = np.zeros(orig.shape, dtype=np.float32)
+        n = min(len(orig), len(voice))
+        voice_mix[:n] = voice[:n]
         
-        ducked_original = original - abs(threshold_db) # Reduce volume
-        return ducked_original.overlay(voice_over)
+        # Sidechain envelope: where is the voice active?
+        window = max(1, int(original.frame_rate * smoothing_ms / 1000))
+        envelope = AudioProcessor._moving_average(np.abs(voice_mix).mean(axis=1), window)
+        activation = 10 ** (activation_db / 20) * original.max_possible_amplitude
+        active = AudioProcessor._moving_average((envelope > activation).astype(np.float32), window)
+
+        gain = 1.0 - (1.0 - 10 ** (-abs(threshold_db) / 20)) * active
+        mixed = orig.astype(np.float32) * gain[:, None].astype(np.float32) + voice_mix
+
+        info = np.iinfo(dtype)
+        out = np.clip(mixed, info.min, info.max).astype(dtype)
+        return original._spawn(out.tobytes())
+
+    @staticmethod
+    def _atempo_chain(speed_factor: float) -> str:
+        """
+        Builds the minimal atempo filter chain for speed_factor.
+        A single atempo stage supports 0.5 to 2.0, so larger changes are split
+        into ceil(|log2(factor)|) equal stages.
+        """
+        stages = max(1, math.ceil(abs(math.log2(speed_factor)) - 1e-9))
+        stage_factor = speed_factor ** (1 / stages)
+        return ",".join([f"atempo={stage_factor:.6f}"] * stages)
 
     @staticmethod
     def speed_match(segment: AudioSegment, target_duration_sec: float) -> AudioSegment:
@@ -145,7 +562,22 @@ class AudioProcessor:
         if current_duration_sec == 0 or target_duration_sec <= 0:
             return segment
 
+        # Differences below ~25ms are inaudible, not worth an ffmpeg run
+        delta_ms = target_duration_sec * 1000 - len(segment)
+        if abs(delta_ms) < 25:
+            return segment
+
         speed_factor = current_duration_sec / target_duration_sec
+
+        # Slightly short segments are padded with trailing silence instead of being slowed down.
+        # Slightly long ones still go through atempo, since truncating would cut speech.
+        if 0.98 <= speed_factor < 1.0:
+            logger.info(
+                f"Padding {delta_ms:.0f}ms of silence to reach {target_duration_sec:.2f}s (Factor: {speed_factor:.3f}x)"
+            )
+            pad_frames = int(delta_ms * segment.frame_rate / 1000)
+            return segment + segment._spawn(b"\x00" * (pad_frames * segment.frame_width))
+
         logger.info(f"Applying speed correction: {current_duration_sec:.2f}s -> {target_duration_sec:.2f}s (Factor: {speed_factor:.2f}x)")
 
         # Sanity check limits
@@ -156,78 +588,105 @@ class AudioProcessor:
         if abs(speed_factor - 1.0) < 0.01:
             return segment
 
-        import subprocess
-        import os
-        from speech_translator.config import Config
-
-        # Create temp files
-        import uuid
-        unique_id = str(uuid.uuid4())[:8]
-        temp_input = Config.TEMP_DIR / f"speed_input_{unique_id}.wav"
-        temp_output = Config.TEMP_DIR / f"speed_output_{unique_id}.wav"
-        
         try:
-            segment.export(str(temp_input), format="wav")
-            
             # Construct ffmpeg command
-            # atempo filter supports 0.5 to 2.0. Chain them for larger changes.
-            filter_str = ""
-            remaining_factor = speed_factor
-            
-            while remaining_factor > 2.0:
-                filter_str += "atempo=2.0,"
-                remaining_factor /= 2.0
-            while remaining_factor < 0.5:
-                filter_str += "atempo=0.5,"
-                remaining_factor /= 0.5
-            
-            filter_str += f"atempo={remaining_factor}"
+            filter_str = AudioProcessor._atempo_chain(speed_factor)
             
+            # Raw PCM is piped through ffmpeg's stdin/stdout so the segment never touches disk
+            pcm_format = _PCM_FORMATS[segment.sample_width]
+            pcm_args = ["-f", pcm_format, "-ar", str(segment.frame_rate), "-ac", str(segment.channels)]
             cmd = [
                 "ffmpeg", "-y",
-                "-i", str(temp_input),
+                "-loglevel", "error",
+                *pcm_args, "-i", "pipe:0",
                 "-filter:a", filter_str,
                 "-vn", # No video
-                str(temp_output)
+                *pcm_args, "pipe:1"
             ]
             
             # Run ffmpeg
-            result = subprocess.run(cmd, capture_output=True, text=True)
+            proc = subprocess.Popen(cmd, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+            out, err = proc.communicate(segment.raw_data)
             
-            if result.returncode != 0:
-                logger.error(f"FFmpeg speedup failed: {result.stderr}")
+            if proc.returncode != 0:
+                logger.error(f"FFmpeg speedup failed: {err.decode('utf-8', errors='replace')}")
                 return segment
                 
-            # Load result
-            if temp_output.exists():
-                processed_segment = AudioSegment.from_file(str(temp_output), format="wav")
-                return processed_segment
-            else:
-                logger.error("FFmpeg output file not found.")
-                return segment
+            return AudioSegment(
+                data=out,
+                sample_width=segment.sample_width,
+                frame_rate=segment.frame_rate,
+                channels=segment.channels
+            )
                 
+        except FileNotFoundError:
+            logger.warning("ffmpeg not found, falling back to librosa time stretching.")
+            return AudioProcessor._time_stretch_fallback(segment, speed_factor)
         except Exception as e:
             logger.error(f"Error in speed_match: {e}")
             return segment
-        finally:
-            if temp_input.exists(): os.remove(temp_input)
-            if temp_output.exists(): os.remove(temp_output)
 
     @staticmethod
-    def merge_video_audio(video_path: str, audio_path: str, output_path: str):
+    def _time_stretch_fallback(segment: AudioSegment, speed_factor: float) -> AudioSegment:
+        """
+        Pitch-preserving time stretch on the NumPy samples, used when ffmpeg is unavailable.
+        librosa is an optional dependency (the "stretch" extra); without it the segment is returned unchanged.
+        """
+        try:
+            import librosa  # type: ignore[import-not-found]
+        except ImportError:
+            logger.warning(
+                "librosa is not installed, skipping speed correction. "
+                "Install the 'stretch' extra to enable it: pip install .[stretch]"
+            )
+            return segment
+
+        samples = AudioBuffer.from_pydub(segment).samples
+        scale = float(segment.max_possible_amplitude)
+        stretched = librosa.effects.time_stretch(samples.T.astype(np.float32) / scale, rate=speed_factor)
+
+        info = np.iinfo(samples.dtype)
+        out = np.clip(stretched.T * scale, info.min, info.max).astype(samples.dtype)
+        return segment._spawn(np.ascontiguousarray(out).tobytes())
+
+    @staticmethod
+    def speed_match_many(items: List[Tuple[AudioSegment, float]]) -> List[AudioSegment]:
+        """
+        Runs speed_match for several (segment, target_duration_sec) pairs concurrently.
+        Each call is an independent ffmpeg process, so threads are enough to keep all cores busy.
+        Results are returned in input order.
+        """
+        if not items:
+            return []
+
+        # ffmpeg spawns its own threads, so leave headroom to avoid oversubscription
+        max_workers = max(1, (os.cpu_count() or 1) // 2)
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            return list(executor.map(lambda item: AudioProcessor.speed_match(*item), items))
+
+    @staticmethod
+    def merge_video_audio(video_path: str, audio_path: Optional[str], output_path: str,
+                          audio_data: Optional[bytes] = None):
         """
         Merges the video track from video_path with the audio track from audio_path.
+        Alternatively, pass the encoded audio as audio_data (audio_path=None) and it is
+        piped to ffmpeg, so it never has to be written to a temp file.
         The output is saved to output_path.
         Uses ffmpeg stream mapping to avoid re-encoding video.
         """
-        import subprocess
-        
-        logger.info(f"Merging video '{video_path}' with audio '{audio_path}' -> '{output_path}'")
+        if audio_data is not None:
+            audio_input = "pipe:0"
+        elif audio_path is not None:
+            audio_input = audio_path
+        else:
+            raise ValueError("merge_video_audio needs either audio_path or audio_data.")
+        logger.info(f"Merging video '{video_path}' with audio '{audio_input}' -> '{output_path}'")
         
         cmd = [
             "ffmpeg", "-y",
+            "-loglevel", "error",
             "-i", video_path,
-            "-i", audio_path,
+            "-i", audio_input,
             "-c:v", "copy",  # Copy video stream without re-encoding
             "-c:a", "aac",   # Encode audio to aac (widely supported)
             "-map", "0:v:0", # Use 1st video stream from 1st input
@@ -237,11 +696,58 @@ class AudioProcessor:
         ]
         
         try:
-            result = subprocess.run(cmd, capture_output=True, text=True)
+            result = subprocess.run(cmd, input=audio_data, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
             if result.returncode != 0:
-                logger.error(f"FFmpeg merge failed: {result.stderr}")
-                raise RuntimeError(f"FFmpeg merge failed: {result.stderr}")
+                stderr = result.stderr.decode("utf-8", errors="replace")
+                logger.error(f"FFmpeg merge failed: {stderr}")
+                raise RuntimeError(f"FFmpeg merge failed: {stderr}")
             logger.info("Video merge successful.")
         except Exception as e:
             logger.error(f"Failed to merge video and audio: {e}")
             raise
+
+    @staticmethod
+    def encode_for_recognition(audio_bytes: bytes, codec: str = "opus",
+                               mime_type: Optional[str] = None) -> Tuple[bytes, str]:
+        """
+        Re-encodes an audio file as 16 kHz mono, which is all speech recognition needs
+        and several times smaller than a 44.1 kHz stereo MP3.
+        Falls back from opus to mp3 to the original bytes (with mime_type) if encoding fails.
+        mime_type defaults to audio/wav for WAV input and audio/mpeg otherwise.
+        Returns (data, mime_type).
+        """
+        if mime_type is None:
+            mime_type = "audio/wav" if audio_bytes.startswith(b'RIFF') else "audio/mpeg"
+        if codec not in _RECOGNITION_CODECS:
+            return audio_bytes, mime_type
+        codec_names = list(_RECOGNITION_CODECS)
+
+        for name in codec_names[codec_names.index(codec):]:
+            output_args, encoded_mime_type = _RECOGNITION_CODECS[name]
+            cmd = [
+                "ffmpeg", "-y",
+                "-loglevel", "error",
+                "-i", "pipe:0",
+                "-vn", "-ac", "1", "-ar", "16000",
+                *output_args, "pipe:1"
+            ]
+            try:
+                result = subprocess.run(cmd, input=audio_bytes, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+            except FileNotFoundError:
+                logger.warning("ffmpeg not found, sending audio without re-encoding.")
+                break
+
+            if result.returncode == 0 and result.stdout:
+                return result.stdout, encoded_mime_type
+            logger.warning(f"Encoding audio as {name} failed: {result.stderr.decode('utf-8', errors='replace')}")
+
+        return audio_bytes, mime_type
+
+
+# Decoders used by AudioProcessor.load_audio_bytes, keyed by detect_audio_format's result
+_AUDIO_LOADERS = {
+    "wav": lambda data: AudioSegment.from_wav(io.BytesIO(data)),
+    "mp3": lambda data: AudioSegment.from_file(io.BytesIO(data), format="mp3"),
+    "ogg": lambda data: AudioSegment.from_file(io.BytesIO(data), format="ogg"),
+    "pcm": lambda data: AudioSegment(data=data, sample_width=2, frame_rate=24000, channels=1),
+}
@@ -0,0 +1,73 @@
+import logging
+import os
+import tempfile
+from pathlib import Path
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+
+class DiskCache:
+    """
+    Small content-addressed file cache with LRU eviction.
+    Entries are plain files named by their key; writes are atomic (temp file + os.replace)
+    so concurrent readers never see partial data, and a hit refreshes the entry's mtime.
+    """
+
+    def __init__(self, directory: Path, max_bytes: int):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0
+
+    def get(self, name: str) -> Optional[bytes]:
+        """Returns the cached bytes for name, or None on a miss."""
+        if not self.enabled:
+            return None
+        path = self.directory / name
+        try:
+            data = path.read_bytes()
+            os.utime(path)
+        except OSError:
+            return None
+        return data
+
+    def set(self, name: str, data: bytes) -> None:
+        """Stores data under name. Cache failures are logged and otherwise ignored."""
+        if not self.enabled:
+            return
+        try:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=self.directory, prefix=".tmp-")
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    f.write(data)
+                os.replace(tmp_path, self.directory / name)
+            except BaseException:
+                Path(tmp_path).unlink(missing_ok=True)
+                raise
+            self._evict()
+        except OSError as e:
+            logger.warning(f"Could not write cache entry {name}: {e}")
+
+    def _evict(self) -> None:
+        """Deletes least recently used entries until the cache fits into max_bytes."""
+        entries = []
+        total = 0
+        with os.scandir(self.directory) as it:
+            for entry in it:
+                if not entry.is_file() or entry.name.startswith(".tmp-"):
+                    continue
+                stat = entry.stat()
+                entries.append((stat.st_mtime_ns, stat.st_size, entry.path))
+                total += stat.st_size
+
+        if total <= self.max_bytes:
+            return
+        for _, size, path in sorted(entries):
+            Path(path).unlink(missing_ok=True)
+            total -= size
+            if total <= self.max_bytes:
+                break
@@ -4,19 +4,13 @@ from pathlib import Path
 
 logger = logging.getLogger(__name__)
 
-def download_content(url: str, output_dir: Path, prefer_video: bool = False) -> Path:
-    """
-    Downloads content from a given URL using yt-dlp.
-    If prefer_video is True, attempts to download the best video+audio.
-    Otherwise, downloads best audio only.
-    Returns the path to the downloaded file.
-    """
-    logger.info(f"Downloading content from: {url} (Video preferred: {prefer_video})")
-    
+
+def _build_ydl_opts(output_dir: Path, prefer_video: bool) -> dict:
+    """Builds the yt-dlp options shared by downloads and stream resolution."""
     # yt-dlp options
     format_selection = 'bestvideo+bestaudio/best' if prefer_video else 'bestaudio/best'
-    
-    ydl_opts = {
+
+    return {
         'format': format_selection,
         'outtmpl': str(output_dir / '%(title)s [%(id)s].%(ext)s'),
         'noplaylist': True,
@@ -28,16 +22,45 @@ def download_content(url: str, output_dir: Path, prefer_video: bool = False) ->
         'js_runtimes': {'node': {'path': '/usr/bin/node'}},
     }
 
+
+def download_content(url: str, output_dir: Path, prefer_video: bool = False) -> Path:
+    """
+    Downloads content from a given URL using yt-dlp.
+    If prefer_video is True, attempts to download the best video+audio.
+    Otherwise, downloads best audio only.
+    Returns the path to the downloaded file.
+    """
+    logger.info(f"Downloading content from: {url} (Video preferred: {prefer_video})")
+
     try:
-        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+        with yt_dlp.YoutubeDL(_build_ydl_opts(output_dir, prefer_video)) as ydl:
             # Extract info to get the filename
             info = ydl.extract_info(url, download=True)
             filename = ydl.prepare_filename(info)
-            
+
             downloaded_path = Path(filename)
             logger.info(f"Downloaded file to: {downloaded_path}")
             return downloaded_path
-            
+
     except Exception as e:
         logger.error(f"Failed to download URL: {e}")
         raise
+
+
+def resolve_audio_stream(url: str) -> dict:
+    """
+    Resolves the direct media URL of the best audio format without downloading anything.
+    Returns yt-dlp's info for that format: 'url' and 'http_headers', plus 'asr' (sample rate)
+    and 'audio_channels' when the site reports them.
+    Raises ValueError if the audio is only available as a merged or fragmented download.
+    """
+    logger.info(f"Resolving audio stream for: {url}")
+    # Nothing is written, the output template is never used
+    ydl_opts = _build_ydl_opts(Path(), prefer_video=False)
+
+    with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+        info = ydl.extract_info(url, download=False)
+
+    if not info.get('url') or info.get('requested_formats') or info.get('fragments'):
+        raise ValueError(f"No single audio stream URL available for: {url}")
+    return info
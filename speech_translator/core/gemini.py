@@ -1,55 +1,383 @@
+import httpx
 from google import genai
+from google.genai import errors as genai_errors
 from google.genai import types
+import atexit
+import functools
+import hashlib
 import logging
 import os
 import json
 import io
 import time
+import random
 import re
+import threading
+from pydantic import BaseModel, ValidationError
 from pydub import AudioSegment
 from pathlib import Path
-from typing import Optional
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from types import MappingProxyType
+from typing import Callable, Deque, Dict, Iterator, List, Mapping, Optional, Tuple
 from speech_translator.config import Config
+from speech_translator.core.audio import AudioProcessor
+from speech_translator.core.cache import DiskCache
 
 logger = logging.getLogger(__name__)
 
+# Mapping logic: 8 categories -> 5 voices
+# Voices: Puck (M), Charon (M-Deep), Fenrir (M-Strong), Kore (F), Aoede (F-High)
+_MONOLOGUE_VOICE_MAP: Mapping[str, str] = MappingProxyType({
+    # Male categories
+    "Boy": "Puck",           # Young/high male
+    "Young Man": "Puck",     # Young male
+    "Man": "Fenrir",         # Adult confident
+    "Elderly Man": "Charon",  # Deep/low for elderly
+
+    # Female categories
+    "Girl": "Aoede",         # High/thin female
+    "Young Woman": "Aoede",  # Young female
+    "Woman": "Kore",         # Adult standard
+    "Elderly Woman": "Kore"  # (Kore sounds more mature than Aoede)
+})
+
+# Dialogue categories are free text from the model; the first keyword found picks the voice.
+# Order matters: "young woman" before "woman", and "woman"/"female" before "man"/"male".
+_CATEGORY_KEYWORD_VOICES: Mapping[str, str] = MappingProxyType({
+    "boy": "Puck",
+    "young man": "Puck",
+    "elderly man": "Charon",
+    "deep": "Charon",
+    "girl": "Aoede",
+    "young woman": "Aoede",
+    "elderly woman": "Kore",
+    "woman": "Kore",
+    "female": "Kore",
+    "man": "Fenrir",
+    "male": "Fenrir",
+    "elderly": "Kore",  # Generic Elderly
+})
+
+
+@functools.lru_cache(maxsize=64)
+def _voice_for_category(category: str) -> str:
+    """Voice for a dialogue speaker category; the same few categories repeat across segments."""
+    category = category.lower()
+    for keyword, voice in _CATEGORY_KEYWORD_VOICES.items():
+        if keyword in category:
+            return voice
+    return "Kore"  # Default
+
+
+_TRANSIENT_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+def _is_transient_error(error: Exception) -> bool:
+    """Rate limits and server-side failures are worth retrying; anything else is not."""
+    if isinstance(error, genai_errors.APIError):
+        return error.code in _TRANSIENT_STATUS_CODES
+    return "429" in str(error) or "RESOURCE_EXHAUSTED" in str(error)
+
+
+def is_fatal_error(error: Exception) -> bool:
+    """
+    Client errors the request itself caused (bad argument, permissions, unknown model):
+    sending the same request again cannot succeed, so callers should not retry.
+    """
+    return (
+        isinstance(error, genai_errors.ClientError)
+        and error.code not in _TRANSIENT_STATUS_CODES
+        and error.code != 408
+    )
+
+
+# TTS text cleanup: runs of dots, and "contains a letter or digit" ([^\W_] is \w minus underscore)
+_DOTS_RE = re.compile(r'\.{2,}')
+_ALNUM_RE = re.compile(r'[^\W_]')
+
+# Retry hints inside error messages, e.g. "Please retry in 21.5s" or "retryDelay": "21s"
+_RETRY_IN_TEXT_RE = re.compile(r'(?:Please retry in |"?retryDelay"?\s*:\s*"?)([\d.]+)s')
+
+
+def server_retry_delay(error: Exception) -> Optional[float]:
+    """
+    Seconds to wait as requested by the server (Retry-After header or RetryInfo detail),
+    falling back to a retry hint in the error message. None if the server gave no hint.
+    """
+    response = getattr(error, "response", None)
+    retry_after = getattr(response, "headers", {}).get("retry-after") if response is not None else None
+    if retry_after:
+        try:
+            return min(float(retry_after), 120.0)
+        except ValueError:
+            pass
+
+    details = getattr(error, "details", None)
+    if isinstance(details, dict):
+        for detail in details.get("error", {}).get("details", []):
+            retry_delay = detail.get("retryDelay") if isinstance(detail, dict) else None
+            if retry_delay and retry_delay.endswith("s"):
+                try:
+                    return min(float(retry_delay[:-1]), 120.0)
+                except ValueError:
+                    pass
+
+    match = _RETRY_IN_TEXT_RE.search(str(error))
+    if match:
+        try:
+            return min(float(match.group(1)), 120.0)
+        except ValueError:
+            pass
+    return None
+
+
+class RpmLimiter:
+    """
+    Sliding-window requests-per-minute limiter shared by all translating threads.
+    A limit of 0 disables it.
+    """
+
+    def __init__(self, rpm_limit: int, window_sec: float = 60.0):
+        self.rpm_limit = rpm_limit
+        self.window_sec = window_sec
+        self._request_times: Deque[float] = deque()
+        self._lock = threading.Lock()
+
+    def _trim(self, current_time: float):
+        """Drops timestamps older than the window (oldest first, amortized O(1))."""
+        while self._request_times and current_time - self._request_times[0] >= self.window_sec:
+            self._request_times.popleft()
+
+    def wait(self):
+        """Blocks until another request fits into the window, then records it."""
+        if self.rpm_limit <= 0:
+            return
+        while True:
+            with self._lock:
+                current_time = time.time()
+                # Remove timestamps older than the window
+                self._trim(current_time)
+
+                if len(self._request_times) < self.rpm_limit:
+                    self._request_times.append(current_time)
+                    return
+
+                # Wait until the oldest request expires
+                oldest_request = self._request_times[0]
+                wait_time = self.window_sec - (current_time - oldest_request) + 0.1  # Buffer
+                logger.info(
+                    f"Rate limit reached ({len(self._request_times)}/{self.rpm_limit}). Waiting {wait_time:.2f}s..."
+                )
+
+            # Sleep without the lock so other threads can check the window meanwhile;
+            # whoever finds a free slot first takes it, the rest wait again
+            time.sleep(wait_time)
+
+
+class TranslationResult(BaseModel):
+    """Structured output of the monologue translation step."""
+    text: str
+    category: Optional[str] = None
+
+
+# Step 1 responses are constrained to TranslationResult JSON, so they parse without guesswork
+_TRANSLATION_RESULT_CONFIG = types.GenerateContentConfig(
+    response_mime_type="application/json",
+    response_schema=TranslationResult
+)
+
+
+class DialogueSegment(BaseModel):
+    """One speaker turn in the structured output of the dialogue translation step."""
+    speaker: str
+    category: str
+    text: str
+    approx_duration_ratio: Optional[float] = None
+
+
+class DialogueResult(BaseModel):
+    """Structured output of the dialogue translation step."""
+    segments: List[DialogueSegment]
+
+
+_DIALOGUE_RESULT_CONFIG = types.GenerateContentConfig(
+    response_mime_type="application/json",
+    response_schema=DialogueResult
+)
+
+
+def _duration_bucket(duration_hint_sec: Optional[float]) -> Optional[float]:
+    """Prompts show the duration with one decimal, so that is all the precision a cache key needs."""
+    return round(duration_hint_sec, 1) if duration_hint_sec else None
+
+
+@functools.lru_cache(maxsize=256)
+def _monologue_prompt(target_lang: str, duration_hint_sec: Optional[float], auto_voice: bool) -> str:
+    """Step 1 prompt of the monologue mode (with speaker classification when auto_voice is set)."""
+    duration_request = (
+        f"Try to keep the speech duration close to {duration_hint_sec:.1f} seconds." if duration_hint_sec else ""
+    )
+    if auto_voice:
+        return (
+            f"Listen to this audio carefully.\n"
+            f"1. Analyze the speaker's voice to identify gender and approximate age.\n"
+            f"   Classify into one of these exact categories:\n"
+            f"   ['Boy', 'Young Man', 'Man', 'Elderly Man', 'Girl', 'Young Woman', 'Woman', 'Elderly Woman']\n"
+            f"2. Translate the spoken content into {target_lang}.\n"
+            f"{f'3. {duration_request}' if duration_request else ''}\n\n"
+            f"Return ONLY a JSON object with this structure:\n"
+            f"{{\n"
+            f"  \"category\": \"CATEGORY_NAME\",\n"
+            f"  \"text\": \"TRANSLATED_TEXT\"\n"
+            f"}}"
+        )
+    return (
+        f"Listen to this audio and translate the spoken content into {target_lang}. "
+        f"{f'{duration_request} ' if duration_request else ''}"
+        "Put ONLY the translated text into the \"text\" field, without any explanations, quotes, or timestamps."
+    )
+
+
+# Dialogue Step 1 prompt; only the target language and the optional duration line vary
+_DIALOGUE_PROMPT_TEMPLATE = (
+    "You are a professional dubbing director. Listen to this audio chunk.\n"
+    "It contains a dialogue or multiple speakers.\n"
+    "1. Identify distinct phrases/turns.\n"
+    "2. For each phrase, identify the Speaker (A, B, C...).\n"
+    "   IMPORTANT: Be conservative with speaker splitting. "
+    "Only assign a new Speaker ID if you are certain it is a different person.\n"
+    "   Do not split speakers based on intonation, emotion, or short pauses. "
+    "If the voice sounds similar, treat it as the same speaker.\n"
+    "3. Classify each speaker's voice: ['Boy', 'Man', 'Deep Man', 'Girl', 'Woman', 'Elderly'].\n"
+    "4. Translate the phrase to {target_lang}.\n"
+    "{duration_line}\n"
+    "Return ONLY a JSON object with a list 'segments':\n"
+    "{{\n"
+    "  \"segments\": [\n"
+    "    {{\"speaker\": \"A\", \"category\": \"Man\", \"text\": \"Hello there.\", \"approx_duration_ratio\": 0.2}},\n"
+    "    {{\"speaker\": \"B\", \"category\": \"Woman\", \"text\": \"Hi! How are you?\", "
+    "\"approx_duration_ratio\": 0.8}}\n"
+    "  ]\n"
+    "}}"
+)
+
+
+@functools.lru_cache(maxsize=256)
+def _dialogue_prompt(target_lang: str, duration_hint_sec: Optional[float]) -> str:
+    """Step 1 prompt of the dialogue mode."""
+    duration_line = (
+        f"5. Try to keep the total speech duration close to {duration_hint_sec:.1f} seconds."
+        if duration_hint_sec else ""
+    )
+    return _DIALOGUE_PROMPT_TEMPLATE.format(target_lang=target_lang, duration_line=duration_line)
+
+
+# Keep-alive pool shared by every request of a client: the translation and TTS calls of
+# all chunks (including concurrently translated ones) reuse warm TLS connections.
+_HTTP_LIMITS = httpx.Limits(max_connections=64, max_keepalive_connections=32, keepalive_expiry=60)
+
+
+@functools.lru_cache(maxsize=8)
+def _read_file_cached(path: str, mtime_ns: int, size: int) -> bytes:
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def _read_audio_file(path: str) -> bytes:
+    """Reads an audio chunk; retries of an unchanged file are served from memory."""
+    stat = os.stat(path)
+    return _read_file_cached(path, stat.st_mtime_ns, stat.st_size)
+
+
 class GeminiClient:
+    # Retries for transient API errors (429 / 5xx), with backoff between BACKOFF_MIN_SEC and BACKOFF_MAX_SEC
+    MAX_API_ATTEMPTS = 5
+    BACKOFF_MIN_SEC = 1.0
+    BACKOFF_MAX_SEC = 30.0
+    # How long list_models() reuses its last result
+    MODELS_CACHE_TTL_SEC = 300
+    # Larger audio is sent through the File API instead of inline base64 (+33% on the wire)
+    INLINE_AUDIO_LIMIT = 1_000_000
+    # Uploaded files are reused by content hash; the server keeps them for 48 hours
+    UPLOAD_CACHE_SIZE = 32
+    UPLOAD_CACHE_TTL_SEC = 24 * 3600
+    # Recently synthesized short phrases ("Yes.", "Okay.") are reused instead of requested again
+    TTS_CACHE_SIZE = 256
+    TTS_CACHE_MAX_TEXT = 200
+    # Upper bound on concurrent TTS requests of one client (dialogue turns)
+    MAX_TTS_WORKERS = 8
+
     def __init__(self):
         Config.validate()
         self.client = genai.Client(
             api_key=Config.GOOGLE_API_KEY,
-            http_options={'api_version': Config.GEMINI_API_VERSION}
+            http_options=types.HttpOptions(
+                api_version=Config.GEMINI_API_VERSION,
+                client_args={'limits': _HTTP_LIMITS}
+            )
         )
         self.thinking_model = Config.THINKING_MODEL
         self.tts_model = Config.TTS_MODEL
-        # Rate Limiting: 10 RPM
-        self._tts_request_times = [] 
-        self._rpm_limit = 10
-        self._rpm_window = 60.0
+        self._cache = DiskCache(
+            Config.TEMP_DIR / "translation_cache",
+            max_bytes=Config.TRANSLATION_CACHE_MB * 1024 * 1024
+        )
+        # Rate Limiting: the thinking and TTS models have independent quotas, so each
+        # gets its own limiter and one saturated model never throttles the other
+        self._thinking_limiter = RpmLimiter(Config.THINKING_RPM)
+        self._tts_limiter = RpmLimiter(Config.TTS_RPM)
+        self._models_lock = threading.Lock()
+        self._models_snapshot = None
+        self._models_fetched_at = 0.0
+        self._uploads = OrderedDict()
+        self._uploads_lock = threading.Lock()
+        self._tts_cache = OrderedDict()
+        self._tts_cache_lock = threading.Lock()
+        # One TTS pool for the whole client: concurrent chunks share its threads instead of each
+        # starting a pool of its own, and the RPM limiter decides when requests actually go out
+        self._tts_executor = ThreadPoolExecutor(
+            max_workers=min(self.MAX_TTS_WORKERS, Config.TTS_RPM or self.MAX_TTS_WORKERS),
+            thread_name_prefix="gemini-tts"
+        )
+
+    def close(self):
+        """Stops the TTS pool, deletes cached File API uploads and closes the underlying HTTP connection pool."""
+        self._tts_executor.shutdown(wait=False, cancel_futures=True)
+        with self._uploads_lock:
+            uploads = [entry[0] for entry in self._uploads.values()]
+            self._uploads.clear()
+        for uploaded in uploads:
+            self._delete_uploaded(uploaded)
+        self.client.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
 
     def list_models(self):
-        """Lists available models from the Gemini API."""
-        return self.client.models.list()
+        """
+        Lists available models from the Gemini API.
+        The list rarely changes, so a snapshot is reused for MODELS_CACHE_TTL_SEC.
+        """
+        with self._models_lock:
+            if self._models_snapshot is None or time.monotonic() - self._models_fetched_at > self.MODELS_CACHE_TTL_SEC:
+                self._models_snapshot = tuple(self.client.models.list())
+                self._models_fetched_at = time.monotonic()
+            return self._models_snapshot
+
+    def refresh_models(self):
+        """Drops the cached model list and fetches it again."""
+        with self._models_lock:
+            self._models_snapshot = None
+        return self.list_models()
 
     def _get_voice_for_category(self, category: str, speaker_id: str = "A") -> str:
         """Helper to map speaker characteristics to Gemini Voices."""
-        category = category.lower()
-        if "boy" in category or "young man" in category:
-            return "Puck"
-        elif "elderly man" in category or "deep" in category:
-            return "Charon"
-        elif "girl" in category or "young woman" in category:
-            return "Aoede"
-        elif "elderly woman" in category:
-             return "Kore"
-        elif "woman" in category or "female" in category:
-            return "Kore"
-        elif "man" in category or "male" in category:
-            return "Fenrir"
-        elif "elderly" in category: # Generic Elderly
-            return "Kore"
-        else: # Default
-            return "Kore"
+        return _voice_for_category(category)
 
     def translate_audio(self, 
                        audio_file_path: str, 
@@ -61,116 +389,170 @@ class GeminiClient:
         Handles both Monologue and Dialogue modes.
         Returns: raw audio bytes (MP3/WAV).
         """
-        with open(audio_file_path, "rb") as f:
-            audio_bytes = f.read()
+        return self.translate_audio_bytes(
+            _read_audio_file(audio_file_path), target_lang, duration_hint_sec, voice_name, mode
+        )
+
+    def translate_audio_bytes(self,
+                              audio_bytes: bytes,
+                              target_lang: str,
+                              duration_hint_sec: Optional[float] = None,
+                              voice_name: str = "Auto",
+                              mode: str = "monologue",
+                              cache_source: Optional[bytes] = None) -> bytes:
+        """
+        Same as translate_audio, for audio that is already in memory (e.g. an encoded chunk),
+        so callers do not need to round-trip it through a temp file.
+        cache_source, if given, is hashed for the disk cache instead of audio_bytes. Pass the
+        raw PCM the audio was encoded from, so the cache key does not depend on the encoder.
+        """
+        if not target_lang or not target_lang.strip():
+            raise ValueError("target_lang must be a non-empty language name.")
+
+        # Identical audio with identical settings (re-runs, retries) is served from disk
+        cache_key = self._cache_key(
+            audio_bytes if cache_source is None else cache_source,
+            target_lang, duration_hint_sec, voice_name, mode
+        )
+        cached_audio = self._cache.get(f"{cache_key}.audio")
+        if cached_audio is not None:
+            logger.info(f"Using cached translated audio ({len(cached_audio)} bytes).")
+            return cached_audio
 
         logger.info(f"Analyzing audio (Mode: {mode}) for translation to {target_lang}...")
 
         if mode == "monologue":
-            return self._process_monologue(audio_bytes, target_lang, duration_hint_sec, voice_name)
+            result, complete = self._process_monologue(
+                audio_bytes, target_lang, duration_hint_sec, voice_name, cache_key=cache_key
+            )
         else:
-            return self._process_dialogue(audio_bytes, target_lang, duration_hint_sec)
+            result, complete = self._process_dialogue(audio_bytes, target_lang, duration_hint_sec)
 
-    def _process_monologue(self, audio_bytes: bytes, target_lang: str, duration_hint_sec: Optional[float], voice_name: str) -> bytes:
+        # A fallback result (unparsed response, dropped segments) is used once but not kept,
+        # so a later run gets another chance at the real translation
+        if complete:
+            self._cache.set(f"{cache_key}.audio", result)
+        else:
+            logger.warning("Not caching the translated audio, since it was produced by a fallback.")
+        return result
+
+    def _cache_key(self, audio_bytes: bytes, target_lang: str, duration_hint_sec: Optional[float],
+                   voice_name: str, mode: str) -> str:
+        """Content hash of the audio plus every setting that changes the translation."""
+        duration = f"{duration_hint_sec:.1f}" if duration_hint_sec else ""
+        hasher = hashlib.blake2b(audio_bytes, digest_size=20)
+        hasher.update(
+            f"{target_lang}|{voice_name}|{mode}|{duration}|{self.thinking_model}|{self.tts_model}".encode()
+        )
+        return hasher.hexdigest()
+
+    def _process_monologue(self, audio_bytes: bytes, target_lang: str, duration_hint_sec: Optional[float],
+                           voice_name: str, cache_key: Optional[str] = None) -> Tuple[bytes, bool]:
         """
         Two-step translation with Advanced Auto-Voice detection (Legacy/Monologue Mode):
         1. Audio -> Translated Text + Detailed Speaker Classification
         2. Translated Text -> Audio (using mapped TTS voice)
+        The Step 1 result is cached on its own, so a retry that only failed in Step 2 skips Step 1.
+        Returns (audio, complete); complete is False if Step 1 fell back to the raw response.
+        """
+        translated_text, selected_voice, complete = self._monologue_step1(
+            audio_bytes, target_lang, duration_hint_sec, voice_name, cache_key
+        )
+
+        # --- Step 2: Generate audio (TTS) ---
+        return self._generate_tts(translated_text, selected_voice), complete
+
+    def _monologue_step1(self, audio_bytes: bytes, target_lang: str, duration_hint_sec: Optional[float],
+                         voice_name: str, cache_key: Optional[str]) -> Tuple[str, str, bool]:
+        """Step 1 of the monologue mode, served from the cache when possible (fallbacks are not cached)."""
+        cached_step1 = self._cache.get(f"{cache_key}.json") if cache_key else None
+        if cached_step1 is not None:
+            step1 = json.loads(cached_step1)
+            logger.info("Using cached translation for this chunk.")
+            return step1["text"], step1["voice"], True
+
+        with self._audio_part(audio_bytes) as audio_part:
+            translated_text, selected_voice, complete = self._translate_monologue_text(
+                audio_part, target_lang, duration_hint_sec, voice_name
+            )
+        if cache_key and complete:
+            step1 = {"text": translated_text, "voice": selected_voice}
+            self._cache.set(f"{cache_key}.json", json.dumps(step1).encode())
+        return translated_text, selected_voice, complete
+
+    def _translate_monologue_text(self, audio_part: types.Part, target_lang: str,
+                                  duration_hint_sec: Optional[float], voice_name: str) -> Tuple[str, str, bool]:
+        """
+        Step 1 of the monologue mode. Returns (translated_text, selected_voice, complete);
+        complete is False if the response was not valid JSON and its raw text is used instead.
         """
         logger.info(f"Step 1: Analyzing speaker and translating to {target_lang}...")
 
         translated_text = ""
         selected_voice = voice_name
+        complete = True
 
         try:
             if voice_name == "Auto":
                 # Extended prompt for age and gender detection
-                prompt_text = (
-                    f"Listen to this audio carefully.\n"
-                    f"1. Analyze the speaker's voice to identify gender and approximate age.\n"
-                    f"   Classify into one of these exact categories:\n"
-                    f"   ['Boy', 'Young Man', 'Man', 'Elderly Man', 'Girl', 'Young Woman', 'Woman', 'Elderly Woman']\n"
-                    f"2. Translate the spoken content into {target_lang}.\n"
-                    f"3. Try to keep the speech duration close to {duration_hint_sec:.1f} seconds.\n\n"
-                    f"Return ONLY a JSON object with this structure:\n"
-                    f"{{\n"
-                    f"  \"category\": \"CATEGORY_NAME\",\n"
-                    f"  \"text\": \"TRANSLATED_TEXT\"\n"
-                    f"}}"
-                )
+                prompt_text = _monologue_prompt(target_lang, _duration_bucket(duration_hint_sec), auto_voice=True)
                 
-                response_text = self.client.models.generate_content(
+                response_text = self._generate_content(
+                    before_attempt=self._thinking_limiter.wait,
                     model=self.thinking_model,
                     contents=[
                         types.Content(
                             parts=[
-                                types.Part.from_bytes(data=audio_bytes, mime_type="audio/mpeg"),
+                                audio_part,
                                 types.Part.from_text(text=prompt_text)
                             ]
                         )
                     ],
-                    config=types.GenerateContentConfig(
-                        response_mime_type="application/json"
-                    )
+                    config=_TRANSLATION_RESULT_CONFIG
                 )
 
                 if not response_text.text:
                     raise ValueError("No response from Gemini.")
 
-                try:
-                    data = json.loads(response_text.text)
-                    translated_text = data.get("text", "").strip()
-                    category = data.get("category", "Woman") # Fallback
+                result = self._parse_translation_result(response_text)
+                if result is not None:
+                    translated_text = result.text.strip()
+                    category = result.category or "Woman"  # Fallback
                     
-                    # Mapping logic: 8 categories -> 5 voices
-                    # Voices: Puck (M), Charon (M-Deep), Fenrir (M-Strong), Kore (F), Aoede (F-High)
-                    
-                    voice_map = {
-                        # Male categories
-                        "Boy": "Puck",           # Young/high male
-                        "Young Man": "Puck",     # Young male
-                        "Man": "Fenrir",         # Adult confident
-                        "Elderly Man": "Charon", # Deep/low for elderly
-                        
-                        # Female categories
-                        "Girl": "Aoede",         # High/thin female
-                        "Young Woman": "Aoede",  # Young female
-                        "Woman": "Kore",         # Adult standard
-                        "Elderly Woman": "Kore"  # (Kore sounds more mature than Aoede)
-                    }
-                    
-                    selected_voice = voice_map.get(category, "Kore")
+                    # Mapping logic: 8 categories -> 5 voices (see _MONOLOGUE_VOICE_MAP)
+                    selected_voice = _MONOLOGUE_VOICE_MAP.get(category, "Kore")
                         
                     logger.info(f"--- Detected Speaker (Monologue) ---")
                     logger.info(f"Category: {category} -> Voice: {selected_voice}")
                     logger.info(f"------------------------------------")
                     
-                except json.JSONDecodeError:
+                else:
                     logger.error(f"Failed to parse JSON: {response_text.text}")
                     translated_text = response_text.text
                     selected_voice = "Kore"
+                    complete = False
 
             else:
                 # Manual voice selection (legacy behavior)
-                prompt_text = (
-                    f"Listen to this audio and translate the spoken content into {target_lang}. "
-                    f"Try to keep the speech duration close to {duration_hint_sec:.1f} seconds. "
-                    "Output ONLY the translated text without any explanations, quotes, or timestamps."
-                )
+                prompt_text = _monologue_prompt(target_lang, _duration_bucket(duration_hint_sec), auto_voice=False)
                 
-                response_text = self.client.models.generate_content(
+                response_text = self._generate_content(
+                    before_attempt=self._thinking_limiter.wait,
                     model=self.thinking_model,
                     contents=[
                         types.Content(
                             parts=[
-                                types.Part.from_bytes(data=audio_bytes, mime_type="audio/mpeg"),
+                                audio_part,
                                 types.Part.from_text(text=prompt_text)
                             ]
                         )
-                    ]
+                    ],
+                    config=_TRANSLATION_RESULT_CONFIG
                 )
-                translated_text = response_text.text.strip()
+                result = self._parse_translation_result(response_text)
+                translated_text = (result.text if result is not None else response_text.text).strip()
                 selected_voice = voice_name
+                complete = result is not None
 
             logger.info(f"Translation result: {translated_text[:100]}...")
 
@@ -178,68 +560,125 @@ class GeminiClient:
             logger.error(f"Step 1 (Translation/Analysis) failed: {e}")
             raise
 
-        # --- Step 2: Generate audio (TTS) ---
-        return self._generate_tts(translated_text, selected_voice)
+        return translated_text, selected_voice, complete
+
+    @staticmethod
+    def _parse_translation_result(response) -> Optional[TranslationResult]:
+        """
+        Returns the structured Step 1 result: the SDK's parsed object if available,
+        otherwise the response text validated locally. None if it is not valid JSON.
+        """
+        parsed = getattr(response, "parsed", None)
+        if isinstance(parsed, TranslationResult):
+            return parsed
+        try:
+            return TranslationResult.model_validate_json(response.text or "")
+        except ValidationError:
+            return None
+
+    @contextmanager
+    def _audio_part(self, audio_bytes: bytes) -> Iterator[types.Part]:
+        """
+        Yields the request part for an audio chunk, re-encoded per Config.UPLOAD_AUDIO_CODEC:
+        inline bytes for small chunks, a File API reference for large ones.
+        """
+        audio_bytes, mime_type = AudioProcessor.encode_for_recognition(audio_bytes, Config.UPLOAD_AUDIO_CODEC)
+        if len(audio_bytes) <= self.INLINE_AUDIO_LIMIT:
+            yield types.Part.from_bytes(data=audio_bytes, mime_type=mime_type)
+            return
+
+        uploaded = self._upload_audio(audio_bytes, mime_type)
+        yield types.Part.from_uri(file_uri=uploaded.uri, mime_type=mime_type)
+
+    def _upload_audio(self, audio_bytes: bytes, mime_type: str):
+        """
+        Uploads audio through the File API, reusing an earlier upload of identical bytes
+        (retries, re-runs, a second pass in another mode) while it is younger than UPLOAD_CACHE_TTL_SEC.
+        The least recently used uploads beyond UPLOAD_CACHE_SIZE are deleted from the server.
+        """
+        key = hashlib.sha256(audio_bytes).hexdigest()
+        with self._uploads_lock:
+            entry = self._uploads.get(key)
+            if entry is not None and time.time() - entry[1] < self.UPLOAD_CACHE_TTL_SEC:
+                self._uploads.move_to_end(key)
+                logger.info(f"Reusing uploaded file {entry[0].name}.")
+                return entry[0]
+
+        logger.info(f"Uploading {len(audio_bytes) / 1_000_000:.1f} MB audio chunk via the File API...")
+        uploaded = self.client.files.upload(
+            file=io.BytesIO(audio_bytes),
+            config=types.UploadFileConfig(mime_type=mime_type)
+        )
+        # Audio is usually ready at once, but the file must be ACTIVE before use
+        while uploaded.state == types.FileState.PROCESSING:
+            time.sleep(1)
+            uploaded = self.client.files.get(name=uploaded.name)
+
+        with self._uploads_lock:
+            stale = self._uploads.pop(key, None)
+            self._uploads[key] = (uploaded, time.time())
+            evicted = [stale[0]] if stale else []
+            while len(self._uploads) > self.UPLOAD_CACHE_SIZE:
+                evicted.append(self._uploads.popitem(last=False)[1][0])
+        for file in evicted:
+            self._delete_uploaded(file)
+        return uploaded
+
+    def _delete_uploaded(self, uploaded):
+        """Deletes a File API upload; failures only leave it to expire on the server."""
+        try:
+            self.client.files.delete(name=uploaded.name)
+        except Exception as e:
+            logger.warning(f"Could not delete uploaded file {uploaded.name}: {e}")
 
-    def _process_dialogue(self, audio_bytes: bytes, target_lang: str, duration_hint_sec: Optional[float]) -> bytes:
+    def _process_dialogue(self, audio_bytes: bytes, target_lang: str,
+                          duration_hint_sec: Optional[float]) -> Tuple[bytes, bool]:
         """
         Advanced handling for multiple speakers.
         1. Diarize & Translate -> List of segments.
-        2. TTS each segment with specific voice.
+        2. TTS with specific voices: one multi-speaker request for two voices,
+           otherwise one request per run of consecutive same-voice segments.
         3. Stitch audio together.
+        Returns (audio, complete); complete is False if no segments were detected
+        or the audio of a turn had to be dropped.
         """
         # 1. Prompt for structured dialogue
-        prompt_text = (
-            f"You are a professional dubbing director. Listen to this audio chunk.\n"
-            f"It contains a dialogue or multiple speakers.\n"
-            f"1. Identify distinct phrases/turns.\n"
-            f"2. For each phrase, identify the Speaker (A, B, C...).\n"
-            f"   IMPORTANT: Be conservative with speaker splitting. Only assign a new Speaker ID if you are certain it is a different person.\n"
-            f"   Do not split speakers based on intonation, emotion, or short pauses. If the voice sounds similar, treat it as the same speaker.\n"
-            f"3. Classify each speaker's voice: ['Boy', 'Man', 'Deep Man', 'Girl', 'Woman', 'Elderly'].\n"
-            f"4. Translate the phrase to {target_lang}.\n"
-            f"{f'5. Try to keep the total speech duration close to {duration_hint_sec:.1f} seconds.' if duration_hint_sec else ''}\n"
-            f"Return ONLY a JSON object with a list 'segments':\n"
-            f"{{\n"
-            f"  \"segments\": [\n"
-            f"    {{\"speaker\": \"A\", \"category\": \"Man\", \"text\": \"Hello there.\", \"approx_duration_ratio\": 0.2}},\n"
-            f"    {{\"speaker\": \"B\", \"category\": \"Woman\", \"text\": \"Hi! How are you?\", \"approx_duration_ratio\": 0.8}}\n"
-            f"  ]\n"
-            f"}}"
-        )
+        prompt_text = _dialogue_prompt(target_lang, _duration_bucket(duration_hint_sec))
 
         try:
-            response = self.client.models.generate_content(
-                model=self.thinking_model,
-                contents=[
-                    types.Content(parts=[
-                        types.Part.from_bytes(data=audio_bytes, mime_type="audio/mpeg"),
-                        types.Part.from_text(text=prompt_text)
-                    ])
-                ],
-                config=types.GenerateContentConfig(response_mime_type="application/json")
-            )
+            with self._audio_part(audio_bytes) as audio_part:
+                response = self._generate_content(
+                    before_attempt=self._thinking_limiter.wait,
+                    model=self.thinking_model,
+                    contents=[
+                        types.Content(parts=[
+                            audio_part,
+                            types.Part.from_text(text=prompt_text)
+                        ])
+                    ],
+                    config=_DIALOGUE_RESULT_CONFIG
+                )
             
-            if not response.text:
-                raise ValueError("Empty response from Gemini Dialogue processing.")
-                
-            data = json.loads(response.text)
-            segments = data.get("segments", [])
+            # The SDK parses schema-constrained output itself; validate the text only if it did not
+            result = getattr(response, "parsed", None)
+            if not isinstance(result, DialogueResult):
+                if not response.text:
+                    raise ValueError("Empty response from Gemini Dialogue processing.")
+                result = DialogueResult.model_validate_json(response.text)
+            segments = result.segments
             
             if not segments:
                 logger.warning("No segments detected in dialogue. Falling back to simple translation.")
                 # Fallback: treat everything as one text
-                full_text = " ".join([s.get("text", "") for s in segments])
-                return self._generate_tts(full_text, "Kore")
+                full_text = " ".join([s.text for s in segments])
+                return self._generate_tts(full_text, "Kore"), False
 
             # 2. Process segments and generate Audio
-            combined_audio = AudioSegment.empty()
-            
             # Print Speaker Summary
             unique_speakers = {}
             for s in segments:
-                spk_id = s.get("speaker", "?")
-                cat = s.get("category", "?")
+                spk_id = s.speaker
+                cat = s.category
                 if spk_id not in unique_speakers:
                      unique_speakers[spk_id] = {
                          "category": cat,
@@ -253,10 +692,11 @@ class GeminiClient:
 
             logger.info(f"Detected {len(segments)} segments in dialogue.")
             
+            jobs = []
             for i, seg in enumerate(segments):
-                text = seg.get("text", "").strip()
-                category = seg.get("category", "Woman")
-                speaker_id = seg.get("speaker", "A")
+                text = seg.text.strip()
+                category = seg.category
+                speaker_id = seg.speaker
                 
                 # Clean text for TTS stability
                 text = self._clean_text_for_tts(text)
@@ -267,61 +707,150 @@ class GeminiClient:
                 # Choose voice
                 voice = self._get_voice_for_category(category, speaker_id)
                 logger.info(f"  [{i+1}] Spk {speaker_id} ({category}) -> {voice}: '{text[:30]}...'")
-                
-                # Generate audio for segment
-                audio_bytes_chunk = self._generate_tts(text, voice)
-                
-                # Convert bytes -> AudioSegment
+                jobs.append((text, voice))
+
+            # Consecutive segments of one voice are spoken in a single request
+            runs = self._voice_runs(jobs)
+            tts_results = None
+            if len({voice for _, voice in runs}) == 2:
+                # Two voices fit into one multi-speaker TTS request for the whole chunk
+                try:
+                    tts_results = [self._generate_multi_speaker_tts(runs)]
+                except Exception as e:
+                    if _is_transient_error(e):
+                        raise
+                    logger.warning(f"Multi-speaker TTS failed ({e}). Falling back to one request per speaker turn.")
+
+            if tts_results is None and runs:
+                # Generate audio for all turns concurrently on the shared TTS pool; the TTS limiter
+                # keeps the request rate within budget and map() returns results in turn order
+                tts_results = list(self._tts_executor.map(lambda run: self._generate_tts(*run), runs))
+
+            # Join the PCM of all turns once; AudioSegment += would copy the whole track per turn
+            pcm_parts = []
+            for audio_bytes_chunk in tts_results or []:
                 try:
-                    seg_audio = self._load_audio_bytes(audio_bytes_chunk)
-                    combined_audio += seg_audio
+                    pcm_parts.append(self._segment_pcm(audio_bytes_chunk))
                     # Optional: Add small pause between segments if needed
                 except Exception as e:
                     logger.error(f"Error processing segment audio: {e}")
+            combined_audio = AudioSegment(data=b"".join(pcm_parts), sample_width=2, frame_rate=24000, channels=1)
             
             # 3. Return combined bytes
             output_buffer = io.BytesIO()
             combined_audio.export(output_buffer, format="mp3")
-            return output_buffer.getvalue()
+            return output_buffer.getvalue(), len(pcm_parts) == len(tts_results or [])
 
         except Exception as e:
             logger.error(f"Dialogue processing failed: {e}")
             raise
 
-    def _load_audio_bytes(self, audio_data: bytes) -> AudioSegment:
-        """Helper to load audio bytes that might be Raw PCM (Gemini default) or MP3/WAV."""
-        if audio_data.startswith(b'RIFF'):
-            return AudioSegment.from_wav(io.BytesIO(audio_data))
-        elif audio_data.startswith(b'ID3') or audio_data.startswith(b'\xFF\xFB'):
-            return AudioSegment.from_file(io.BytesIO(audio_data))
-        else:
-             # Assume Raw PCM 24kHz 16bit Mono (Gemini standard)
-            return AudioSegment(
-                data=audio_data,
-                sample_width=2,
-                frame_rate=24000,
-                channels=1
+    @staticmethod
+    def _voice_runs(jobs: List[Tuple[str, str]]) -> List[Tuple[str, str]]:
+        """Merges consecutive (text, voice) items of the same voice into one (text, voice) turn."""
+        runs: List[Tuple[str, str]] = []
+        for text, voice in jobs:
+            if runs and runs[-1][1] == voice:
+                runs[-1] = (f"{runs[-1][0]}\n{text}", voice)
+            else:
+                runs.append((text, voice))
+        return runs
+
+    @staticmethod
+    def _tts_audio(response) -> bytes:
+        """Returns the audio data of a TTS response, or raises ValueError explaining why there is none."""
+        if not response.candidates:
+            raise ValueError("TTS API returned no candidates.")
+
+        candidate = response.candidates[0]
+        if not candidate.content:
+            # Check for safety blocks or other reasons
+            finish_reason = getattr(candidate, 'finish_reason', 'UNKNOWN')
+            safety_ratings = getattr(candidate, 'safety_ratings', [])
+            raise ValueError(f"TTS API returned no content. Finish reason: {finish_reason}. Safety: {safety_ratings}")
+
+        for part in candidate.content.parts:
+            if part.inline_data:
+                return part.inline_data.data
+        raise ValueError("No audio data in TTS response")
+
+    def _generate_multi_speaker_tts(self, runs: List[Tuple[str, str]]) -> bytes:
+        """
+        Speaks a whole two-voice dialogue with one multi-speaker TTS request.
+        runs are (text, voice) turns in order; each voice gets a speaker label in the transcript.
+        """
+        speakers: Dict[str, str] = {}
+        for _, voice in runs:
+            speakers.setdefault(voice, f"Speaker{len(speakers) + 1}")
+        logger.info(f"Generating multi-speaker speech for {len(runs)} turns ({', '.join(speakers)})...")
+
+        transcript = "\n".join(f"{speakers[voice]}: {text}" for text, voice in runs)
+        speech_config = types.SpeechConfig(
+            multi_speaker_voice_config=types.MultiSpeakerVoiceConfig(
+                speaker_voice_configs=[
+                    types.SpeakerVoiceConfig(
+                        speaker=label,
+                        voice_config=types.VoiceConfig(
+                            prebuilt_voice_config=types.PrebuiltVoiceConfig(voice_name=voice)
+                        )
+                    )
+                    for voice, label in speakers.items()
+                ]
+            )
+        )
+        response = self._generate_content(
+            before_attempt=self._tts_limiter.wait,
+            model=self.tts_model,
+            contents=[types.Content(parts=[types.Part.from_text(
+                text=f"TTS the following conversation between {' and '.join(speakers.values())}:\n{transcript}"
+            )])],
+            config=types.GenerateContentConfig(
+                response_modalities=["AUDIO"],
+                speech_config=speech_config
             )
+        )
+        return self._tts_audio(response)
 
-    def _wait_for_rate_limit(self):
-        """Enforces 10 RPM limit for TTS requests."""
-        current_time = time.time()
-        # Remove timestamps older than 60 seconds
-        self._tts_request_times = [t for t in self._tts_request_times if current_time - t < self._rpm_window]
-        
-        if len(self._tts_request_times) >= self._rpm_limit:
-            # Wait until the oldest request expires
-            oldest_request = self._tts_request_times[0]
-            wait_time = self._rpm_window - (current_time - oldest_request) + 0.1 # Buffer
-            if wait_time > 0:
-                logger.info(f"Rate limit reached ({len(self._tts_request_times)}/{self._rpm_limit}). Waiting {wait_time:.2f}s...")
-                time.sleep(wait_time)
-            
-            # Re-clean after wait
-            current_time = time.time()
-            self._tts_request_times = [t for t in self._tts_request_times if current_time - t < self._rpm_window]
+    def _generate_content(self, before_attempt: Optional[Callable[[], None]] = None, **kwargs):
+        """
+        client.models.generate_content with bounded retries for rate limits and server errors.
+        Waits use exponential backoff with jitter, or the server's retry delay when it sends one.
+        before_attempt runs ahead of every attempt (e.g. a rate limiter).
+        """
+        for attempt in range(1, self.MAX_API_ATTEMPTS + 1):
+            if before_attempt:
+                before_attempt()
+            try:
+                return self.client.models.generate_content(**kwargs)
+            except Exception as e:
+                if attempt == self.MAX_API_ATTEMPTS or not _is_transient_error(e):
+                    raise
+                delay = server_retry_delay(e)
+                if delay is None:
+                    delay = random.uniform(
+                        self.BACKOFF_MIN_SEC, min(self.BACKOFF_MAX_SEC, self.BACKOFF_MIN_SEC * 2 ** attempt)
+                    )
+                logger.warning(
+                    f"Gemini request failed ({e}). "
+                    f"Retrying in {delay:.1f}s (attempt {attempt}/{self.MAX_API_ATTEMPTS})..."
+                )
+                time.sleep(delay)
 
-        self._tts_request_times.append(current_time)
+    def _load_audio_bytes(self, audio_data: bytes) -> AudioSegment:
+        """Helper to load audio bytes that might be Raw PCM (Gemini default) or MP3/WAV."""
+        return AudioProcessor.load_audio_bytes(audio_data)
+
+    def _segment_pcm(self, audio_data: bytes) -> bytes:
+        """
+        Returns TTS audio as raw 24kHz 16-bit mono PCM, ready to be joined with other segments.
+        Raw PCM (the Gemini default) is passed through; WAV/MP3 is decoded and converted.
+        """
+        if AudioProcessor.is_raw_pcm(audio_data):
+            if len(audio_data) % 2:
+                raise ValueError(f"Raw PCM audio has an odd length ({len(audio_data)} bytes).")
+            return audio_data
+        segment = self._load_audio_bytes(audio_data)
+        return segment.set_frame_rate(24000).set_channels(1).set_sample_width(2).raw_data
 
     def _clean_text_for_tts(self, text: str) -> str:
         """
@@ -333,77 +862,107 @@ class GeminiClient:
         
         # 1. Replace multiple dots/ellipses with single dot (e.g. "Yeah...." -> "Yeah.")
         # This helps because Gemini TTS sometimes chokes on long ellipses.
-        text = re.sub(r'\.{2,}', '.', text)
+        text = _DOTS_RE.sub('.', text)
         
         # 2. whitespace cleanup
         text = text.strip()
         
-        # 3. Check if text is only punctuation
-        if not any(c.isalnum() for c in text):
+        # 3. Check if text is only punctuation (a letter or digit anywhere, found in C)
+        if not _ALNUM_RE.search(text):
             return ""
             
         return text
 
+    @staticmethod
+    def _tts_config(voice_name: str) -> types.GenerateContentConfig:
+        """Request config for the TTS model with a prebuilt voice."""
+        speech_config = types.SpeechConfig(
+            voice_config=types.VoiceConfig(
+                prebuilt_voice_config=types.PrebuiltVoiceConfig(voice_name=voice_name)
+            )
+        )
+        return types.GenerateContentConfig(
+            response_modalities=["AUDIO"],
+            speech_config=speech_config
+        )
+
     def _generate_tts(self, text: str, voice_name: str) -> bytes:
-        """Internal helper to call TTS model for a piece of text."""
+        """
+        Internal helper to call TTS model for a piece of text.
+        Short texts are memoized per voice (LRU of TTS_CACHE_SIZE), since dubbing repeats them a lot.
+        If the voice keeps failing, the text is spoken with the Kore voice instead, and that
+        audio is memoized under Kore only.
+        """
+        cacheable = len(text) <= self.TTS_CACHE_MAX_TEXT
+        if cacheable:
+            with self._tts_cache_lock:
+                cached = self._tts_cache.get((voice_name, text))
+                if cached is not None:
+                    self._tts_cache.move_to_end((voice_name, text))
+                    logger.info(f"Reusing speech for '{text[:30]}' (voice '{voice_name}').")
+                    return cached
+
+        try:
+            audio = self._request_tts(text, voice_name)
+        except Exception as e:
+            # Fallback to Kore voice if possible and not already using it
+            if _is_transient_error(e) or voice_name == "Kore":
+                raise
+            logger.warning(f"Failed with voice {voice_name}. Retrying one last time with fallback voice 'Kore'...")
+            return self._generate_tts(text, "Kore")
+
+        if cacheable:
+            with self._tts_cache_lock:
+                self._tts_cache[(voice_name, text)] = audio
+                while len(self._tts_cache) > self.TTS_CACHE_SIZE:
+                    self._tts_cache.popitem(last=False)
+        return audio
+
+    def _request_tts(self, text: str, voice_name: str) -> bytes:
+        """Calls the TTS model with retries; raises the last error if every attempt failed."""
         logger.info(f"Generating speech using voice '{voice_name}'...")
         
         max_retries = 3
-        retry_delay = 30 # Default if no retry-after header
         
         for attempt in range(max_retries):
             try:
-                self._wait_for_rate_limit()
-                
-                speech_config = types.SpeechConfig(
-                    voice_config=types.VoiceConfig(
-                        prebuilt_voice_config=types.PrebuiltVoiceConfig(voice_name=voice_name)
-                    )
-                )
-                response = self.client.models.generate_content(
+                # Every attempt, including backoff retries, goes through the RPM limiter
+                response = self._generate_content(
+                    before_attempt=self._tts_limiter.wait,
                     model=self.tts_model,
                     contents=[types.Content(parts=[types.Part.from_text(text=text)])],
-                    config=types.GenerateContentConfig(
-                        response_modalities=["AUDIO"],
-                        speech_config=speech_config
-                    )
+                    config=self._tts_config(voice_name)
                 )
                 
-                if not response.candidates:
-                    raise ValueError("TTS API returned no candidates.")
-                
-                candidate = response.candidates[0]
-                if not candidate.content:
-                     # Check for safety blocks or other reasons
-                    finish_reason = getattr(candidate, 'finish_reason', 'UNKNOWN')
-                    safety_ratings = getattr(candidate, 'safety_ratings', [])
-                    raise ValueError(f"TTS API returned no content. Finish reason: {finish_reason}. Safety: {safety_ratings}")
-                
-                for part in candidate.content.parts:
-                    if part.inline_data:
-                        return part.inline_data.data
-                raise ValueError("No audio data in TTS response")
+                return self._tts_audio(response)
 
             except Exception as e:
-                is_rate_limit = "429" in str(e) or "RESOURCE_EXHAUSTED" in str(e)
-                if is_rate_limit:
-                    logger.warning(f"TTS Rate limit hit for voice {voice_name}: {e}")
-                    if attempt < max_retries - 1:
-                        logger.info(f"Retrying TTS in {retry_delay}s...")
-                        time.sleep(retry_delay)
-                        continue
+                if _is_transient_error(e):
+                    # _generate_content already backed off until its attempts ran out;
+                    # another voice would hit the same quota
+                    logger.error(f"TTS gen failed for voice {voice_name} after retries: {e}")
+                    raise
                 
                 logger.error(f"TTS gen failed for voice {voice_name} (Attempt {attempt+1}): {e}")
                 logger.error(f"Failed Text: '{text[:100]}...'")
                 
-                # Add a small delay even for non-rate-limit errors to avoid rapid-fire failures
+                # Add a small delay even for non-transient errors to avoid rapid-fire failures
                 time.sleep(2)
                 
                 if attempt == max_retries - 1:
-                    # Fallback to Kore voice if possible and not already using it
-                    if voice_name != "Kore":
-                         logger.warning(f"Failed with voice {voice_name}. Retrying one last time with fallback voice 'Kore'...")
-                         return self._generate_tts(text, "Kore")
                     raise
 
         raise ValueError("TTS generation failed unexpectedly")
+
+
+@functools.lru_cache(maxsize=1)
+def get_client() -> GeminiClient:
+    """
+    Returns the process-wide GeminiClient, created on first use.
+    The SDK client and its pooled httpx connections are thread-safe, so one instance
+    serves every chunk and worker thread (and keeps its connections warm).
+    It is closed when the interpreter exits.
+    """
+    client = GeminiClient()
+    atexit.register(client.close)
+    return client
@@ -1,53 +1,74 @@
 import logging
-import os
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
 from pydub import AudioSegment
 from pathlib import Path
-from speech_translator.config import Config
+from typing import Mapping, Optional
+from speech_translator.config import Config, VIDEO_EXTENSIONS
 from speech_translator.core.audio import AudioProcessor
-from speech_translator.core.gemini import GeminiClient
-from speech_translator.core.downloader import download_content
+from speech_translator.core.gemini import get_client, is_fatal_error, server_retry_delay
+from speech_translator.core.downloader import download_content, resolve_audio_stream
 
 logger = logging.getLogger(__name__)
 
+# Sample rate of Gemini TTS output. Silence stand-ins are created at this rate so the timeline
+# mix does not have to resample them (pydub's default silence is 11025 Hz)
+_TTS_FRAME_RATE = 24000
+
+
 class TranslationOrchestrator:
     def __init__(self):
         self.audio_processor = AudioProcessor()
-        self.gemini_client = GeminiClient()
+        self.gemini_client = get_client()
 
     def process(self, input_path: str, output_path: str, target_lang: str, ducking: bool = False, voice_name: str = "Kore", mode: str = "monologue"):
         """
         Main pipeline: Load -> Split -> Translate -> Merge -> (Broadcast/Duck) -> Save.
         """
+        Config.ensure_temp_dir()
+
         # Determine output format and need for video early
-        is_video_output = Path(output_path).suffix.lower() in [".mp4", ".mov", ".mkv", ".avi", ".webm"]
+        is_video_output = Path(output_path).suffix.lower() in VIDEO_EXTENSIONS
         
         # Determine if input is URL or File
         is_url = input_path.startswith("http://") or input_path.startswith("https://")
         downloaded_temp_file = None
         original_video_path = None # Track original video for dubbing
+        original_audio = None
 
-        if is_url:
+        # Audio-only output needs no local copy of a URL: decode its stream into memory
+        if is_url and not is_video_output:
+            original_audio = self._stream_url_audio(input_path)
+
+        if original_audio is not None:
+            # Streamed: there is no local file, only the URL to log
+            source_label = input_path
+        elif is_url:
             logger.info("URL detected. Initiating download...")
             try:
                 # If output is video, try to download video source
                 downloaded_temp_file = download_content(input_path, Config.TEMP_DIR, prefer_video=is_video_output)
-                input_file = downloaded_temp_file
+                input_file: Path = downloaded_temp_file
+                source_label = str(input_file)
                 # YouTube downloads are usually video (webm/mp4) or audio (m4a/mp3). 
                 # If it's a video container, we can use it for dubbing.
-                if input_file.suffix.lower() in [".mp4", ".mov", ".mkv", ".avi", ".webm"]:
+                if input_file.suffix.lower() in VIDEO_EXTENSIONS:
                     original_video_path = str(input_file)
             except Exception as e:
                 raise RuntimeError(f"Could not download content from URL: {e}")
         else:
             input_file = Path(input_path)
+            source_label = str(input_file)
             if not input_file.exists():
                 raise FileNotFoundError(f"Input file not found: {input_path}")
             
             # Check if local input is video
-            if input_file.suffix.lower() in [".mp4", ".mov", ".mkv", ".avi", ".webm"]:
+            if input_file.suffix.lower() in VIDEO_EXTENSIONS:
                 original_video_path = str(input_file)
 
-        logger.info(f"Starting processing for {input_file}")
+        logger.info(f"Starting processing for {source_label}")
         
         try:
             # 1. Load Audio
@@ -55,7 +76,8 @@ class TranslationOrchestrator:
             if original_video_path:
                 logger.info(f"Video file detected: {Path(original_video_path).name}. Extracting audio track...")
                 
-            original_audio = self.audio_processor.load_audio(str(input_file))
+            if original_audio is None:
+                original_audio = self.audio_processor.load_audio(str(input_file))
             total_duration = len(original_audio) / 1000.0
             
             # 2. Strategy Decision: Split into chunks
@@ -63,148 +85,44 @@ class TranslationOrchestrator:
             # and granular error handling. Default chunk size is 300s (5 min).
             chunks_data = self.audio_processor.detect_speech_intervals(original_audio)
             
-            translated_segments_data = []
-            
-            for i, chunk_info in enumerate(chunks_data):
-                chunk = chunk_info['audio']
-                chunk_start = chunk_info['start']
-                chunk_duration = len(chunk) / 1000.0
-                logger.info(f"Processing chunk {i+1}/{len(chunks_data)} ({chunk_duration:.2f}s)...")
-                
-                # Save temp chunk
-                temp_chunk_path = Config.TEMP_DIR / f"temp_chunk_{i}.mp3"
-                self.audio_processor.save_audio(chunk, str(temp_chunk_path))
-                
-                import time
-                max_retries = 3
-                retry_delay = 60
-                
-                translated_chunk_success = False
-                
-                for attempt in range(max_retries):
-                    try:
-                        # API Call
-                        # We ask Gemini to match the duration of the chunk for sync
-                        logger.info(f"Sending audio chunk to Gemini (Mode: {mode})...")
-                        
-                        translated_bytes = self.gemini_client.translate_audio(
-                            str(temp_chunk_path), 
-                            target_lang, 
-                            duration_hint_sec=chunk_duration,
-                            voice_name=voice_name,
-                            mode=mode
-                        )
-                        
-                        # Write response to temp file to load back into pydub
-                        
-                        # Detect format based on header
-                        # Gemini often returns WAV (RIFF header) even if we requested AUDIO (default)
-                        header_hex = translated_bytes[:32].hex()
-                        
-                        # --- Format Detection & Handling ---
-                        # Case 1: Standard WAV (RIFF)
-                        if translated_bytes.startswith(b'RIFF'):
-                            ext = ".wav"
-                        # Case 2: Raw PCM (e.g., audio/L16;codec=pcm;rate=24000)
-                        # The DEBUG logs showed MimeType: audio/L16;codec=pcm;rate=24000
-                        # And header all zeros (silence).  We need to wrap this in a WAV container.
-                        elif len(translated_bytes) > 0 and not translated_bytes.startswith(b'ID3') and not translated_bytes.startswith(b'\xFF\xFB'):
-                             # Assuming 24000Hz, 1 channel, 16-bit based on log "audio/L16;codec=pcm;rate=24000"
-                             # Ideally we should pass the mimetype back from gemini.py, but for now we infer.
-                             import wave
-                             
-                             ext = ".wav"
-                             # Wrap raw PCM in WAV
-                             # We'll create a new simplified bytes object with WAV header
-                             # Wrap raw PCM in WAV container immediately before saving to simplify loading.
-                             
-                             logger.info("Raw PCM detected, wrapping in WAV container...")
-                             
-                             pcm_path = Config.TEMP_DIR / f"temp_raw_{i}.pcm"
-                             wav_path = Config.TEMP_DIR / f"translated_chunk_{i}.wav"
-                             
-                             # Parameters matched to "audio/L16;codec=pcm;rate=24000"
-                             with wave.open(str(wav_path), 'wb') as wav_file:
-                                 wav_file.setnchannels(1)
-                                 wav_file.setsampwidth(2) # 16-bit = 2 bytes
-                                 wav_file.setframerate(24000)
-                                 wav_file.writeframes(translated_bytes)
-                                 
-                             # Modify temp_out_path to point to this new wav file
-                             # Skip the standard write below by setting a flag since we handled it here.
-                             temp_out_path = wav_path
-                             ext = ".wav" # signal for logging
-                             
-                             # SKIP writing translated_bytes again below, we already wrote the WAV
-                             # To avoid double write, we can use a flag
-                             wrote_file_already = True
+            # Silence is judged against the track's own loudness, so a quietly recorded
+            # input is not mistaken for silence chunk by chunk
+            track_dbfs = self.audio_processor._dbfs(original_audio)
 
-                        else:
-                            ext = ".mp3" # Assume MP3 otherwise, or let pydub/ffmpeg figure it out if we were ignoring extension errors.
-                            wrote_file_already = False
-                            
-                        # Debug print to ensure code is running
-                        print(f"DEBUG: Chunk {i} received {len(translated_bytes)} bytes.", flush=True)
-                        print(f"DEBUG: Detected extension: {ext}", flush=True)
-                        # print(f"DEBUG: Header (hex): {header_hex}", flush=True)
+            # Chunks are independent network-bound round-trips (translation + TTS),
+            # so several are kept in flight at once; map() preserves chunk order.
+            translate = partial(
+                self._translate_chunk,
+                total=len(chunks_data),
+                target_lang=target_lang,
+                voice_name=voice_name,
+                mode=mode,
+                track_dbfs=track_dbfs
+            )
+            workers = max(1, min(Config.TRANSLATION_CONCURRENCY, len(chunks_data)))
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                translated_segments_data = list(executor.map(translate, range(len(chunks_data)), chunks_data))
 
-                        if not locals().get("wrote_file_already", False):
-                            temp_out_path = Config.TEMP_DIR / f"translated_chunk_{i}{ext}"
-                            with open(temp_out_path, "wb") as f:
-                                f.write(translated_bytes)
-                        
-                        translated_segment = self.audio_processor.load_audio(str(temp_out_path))
-                        
-                        # Trim silence to improve sync
-                        translated_segment = self.audio_processor.trim_silence(translated_segment)
-                        
-                        # Check Duration & Adjust if strictly needed (simple fallback)
-                        actual_duration = len(translated_segment) / 1000.0
-                        diff = abs(actual_duration - chunk_duration)
-                        if diff > 0.2: # Drift threshold reduced to 0.2s for tighter sync
-                            logger.warning(f"Drift detected in chunk {i}: target {chunk_duration}s, got {actual_duration}s. Attempting speed correction.")
-                            translated_segment = self.audio_processor.speed_match(translated_segment, chunk_duration)
-                        
-                        translated_segments_data.append({
-                            'audio': translated_segment,
-                            'start': chunk_start
-                        })
-                        translated_chunk_success = True
-                        break # Success, exit retry loop
-                        
-                    except Exception as e:
-                        if "429" in str(e) or "RESOURCE_EXHAUSTED" in str(e):
-                            logger.warning(f"Rate limit hit for chunk {i}: {e}")
-                            if attempt < max_retries - 1:
-                                logger.info(f"Retrying in {retry_delay}s...")
-                                time.sleep(retry_delay)
-                                continue
-                        
-                        # If not rate limit or retries exhausted, re-raise to handle as failure
-                        logger.error(f"Failed to process chunk {i} on attempt {attempt+1}: {e}")
-                        if attempt == max_retries - 1:
-                            # Final failure
-                            logger.error("Inserting silence for failed chunk to maintain sync.")
-                            translated_segments_data.append({
-                                'audio': AudioSegment.silent(duration=len(chunk)),
-                                'start': chunk_start
-                            })
-                
-                # Cleanup temp files
-                if temp_chunk_path.exists(): os.remove(temp_chunk_path)
-                # Cleanup potential temp files with different extensions
-                for ext in [".mp3", ".wav"]:
-                    temp_translated_path = Config.TEMP_DIR / f"translated_chunk_{i}{ext}"
-                    if temp_translated_path.exists(): os.remove(temp_translated_path)
+            # Speed correction spawns one ffmpeg per drifted chunk; run them concurrently
+            drifted = [seg_data for seg_data in translated_segments_data if seg_data.get('target_duration')]
+            if drifted:
+                corrected = self.audio_processor.speed_match_many(
+                    [(seg_data['audio'], seg_data['target_duration']) for seg_data in drifted]
+                )
+                for seg_data, corrected_audio in zip(drifted, corrected):
+                    seg_data['audio'] = corrected_audio
 
             # 3. Merge (Overlay on timeline)
             logger.info("Merging processed segments onto timeline...")
             
-            # Create a silent track of the total duration
-            final_voice = AudioSegment.silent(duration=int(total_duration * 1000))
-            
-            for seg_data in translated_segments_data:
-                final_voice = final_voice.overlay(seg_data['audio'], position=seg_data['start'])
+            # Mix every segment into one silent track of the total duration.
+            # When ducking, the track is built in the original's format right away, so only the
+            # speech is converted rather than the whole voice track a second time.
+            final_voice = self.audio_processor.overlay_segments(
+                int(total_duration * 1000),
+                [(seg_data['audio'], seg_data['start']) for seg_data in translated_segments_data],
+                like=original_audio if ducking else None
+            )
             
             # 4. Post-processing (Ducking)
             if ducking:
@@ -221,15 +139,13 @@ class TranslationOrchestrator:
             if is_video_output and original_video_path:
                 logger.info(f"Output is video ({Path(output_path).name}) and original video available. Merging translated audio into video...")
                 
-                # We must first save the final audio to a temp file
-                temp_final_audio = Config.TEMP_DIR / "final_translated_audio.wav"
-                self.audio_processor.save_audio(final_output, str(temp_final_audio), format="wav")
-                
+                # The final audio is piped to ffmpeg as WAV instead of going through a temp file
                 try:
                     self.audio_processor.merge_video_audio(
                         video_path=original_video_path,
-                        audio_path=str(temp_final_audio),
-                        output_path=output_path
+                        audio_path=None,
+                        output_path=output_path,
+                        audio_data=self.audio_processor.encode_audio(final_output, format="wav")
                     )
                 except Exception as e:
                     logger.error(f"Failed to merge video and audio: {e}")
@@ -244,10 +160,6 @@ class TranslationOrchestrator:
                         fallback_path = str(output_path) + ".mp3"
                         logger.error(f"Failed to save audio to original path: {e2}. Saving to {fallback_path}")
                         self.audio_processor.save_audio(final_output, fallback_path)
-
-                finally:
-                    if temp_final_audio.exists():
-                        os.remove(temp_final_audio)
             
             else:
                  # Standard audio export
@@ -257,6 +169,140 @@ class TranslationOrchestrator:
             logger.info("Done!")
             
         finally:
-            if downloaded_temp_file and downloaded_temp_file.exists():
+            if downloaded_temp_file:
                 logger.info(f"Cleaning up downloaded file: {downloaded_temp_file}")
-                os.remove(downloaded_temp_file)
+                downloaded_temp_file.unlink(missing_ok=True)
+
+    def _stream_url_audio(self, url: str) -> Optional[AudioSegment]:
+        """
+        Decodes the audio of url straight from its media stream, without a temp file.
+        Returns None, so the caller downloads instead, if the stream cannot be resolved or decoded.
+        """
+        try:
+            stream = resolve_audio_stream(url)
+            logger.info("URL detected. Streaming audio without downloading...")
+            return self.audio_processor.load_audio_stream(
+                stream['url'],
+                frame_rate=int(stream.get('asr') or 48000),
+                channels=int(stream.get('audio_channels') or 2),
+                headers=stream.get('http_headers')
+            )
+        except Exception as e:
+            logger.warning(f"Could not stream audio from URL, downloading it instead: {e}")
+            return None
+
+    def _translate_chunk(self, i: int, chunk_info: Mapping, total: int, target_lang: str, voice_name: str, mode: str,
+                         track_dbfs: float) -> dict:
+        """
+        Translates one speech chunk (with retries) and returns its timeline entry.
+        Safe to run concurrently: the chunk audio never leaves memory.
+        track_dbfs is the loudness of the whole input; the silence thresholds are relative to it.
+        """
+        chunk = chunk_info['audio']
+        chunk_start = chunk_info['start']
+        # The interval bounds already give the length; no need to measure the slice
+        chunk_ms = chunk_info['end'] - chunk_start
+        chunk_duration = chunk_ms / 1000.0
+        logger.info(f"Processing chunk {i+1}/{total} ({chunk_duration:.2f}s)...")
+
+        # A near-silent chunk would cost two Gemini round-trips to produce silence
+        if self.audio_processor.is_silent(
+            chunk,
+            track_dbfs + Config.SILENT_CHUNK_OFFSET_DB,
+            track_dbfs + Config.SILENT_CHUNK_PEAK_OFFSET_DB
+        ):
+            logger.info(f"Chunk {i+1}/{total} is silent, skipping translation.")
+            return {
+                'audio': AudioSegment.silent(duration=chunk_ms, frame_rate=_TTS_FRAME_RATE),
+                'start': chunk_start
+            }
+
+        # Encode the chunk once in memory; retries resend the same bytes.
+        # WAV is just a header on the PCM we already hold, so the one real encode is the
+        # compact re-encode for the speech model; only when that is disabled do we send MP3.
+        upload_format = "mp3" if Config.UPLOAD_AUDIO_CODEC == "original" else "wav"
+        chunk_bytes = self.audio_processor.encode_audio(chunk, format=upload_format)
+
+        max_retries = 3
+        # Backoff base for rate limits that outlasted GeminiClient's own retries:
+        # doubles per attempt (capped at max_retry_delay), with +-20% jitter
+        retry_delay = 30
+        max_retry_delay = 300
+        # Other failures (bad audio, parsing) are retried after 0.5s, then 1s
+        transient_retry_delay = 0.5
+
+        for attempt in range(max_retries):
+            try:
+                # API Call
+                # We ask Gemini to match the duration of the chunk for sync
+                logger.info(f"Sending audio chunk to Gemini (Mode: {mode})...")
+
+                translated_bytes = self.gemini_client.translate_audio_bytes(
+                    chunk_bytes,
+                    target_lang,
+                    duration_hint_sec=chunk_duration,
+                    voice_name=voice_name,
+                    mode=mode,
+                    # Reruns hit the disk cache even if the encoder output is not byte-stable
+                    cache_source=chunk.raw_data
+                )
+
+                # The hex dump is only built when debug logging is on
+                if logger.isEnabledFor(logging.DEBUG):
+                    logger.debug(
+                        f"Chunk {i} received {len(translated_bytes)} bytes, header: {translated_bytes[:32].hex()}"
+                    )
+
+                # Decoded in memory: WAV (RIFF), MP3, or raw 24kHz PCM as Gemini TTS returns by default
+                translated_segment = self.audio_processor.load_audio_bytes(translated_bytes)
+
+                # Trim silence to improve sync
+                translated_segment = self.audio_processor.trim_silence(translated_segment)
+
+                # Check Duration & Adjust if strictly needed (simple fallback)
+                actual_duration = len(translated_segment) / 1000.0
+                diff = abs(actual_duration - chunk_duration)
+                target_duration = None
+                if diff > 0.2:  # Drift threshold reduced to 0.2s for tighter sync
+                    logger.warning(
+                        f"Drift detected in chunk {i}: target {chunk_duration}s, got {actual_duration}s. "
+                        "Attempting speed correction."
+                    )
+                    target_duration = chunk_duration
+
+                return {
+                    'audio': translated_segment,
+                    'start': chunk_start,
+                    'target_duration': target_duration
+                }
+
+            except Exception as e:
+                message = str(e)
+                if "429" in message or "RESOURCE_EXHAUSTED" in message:
+                    logger.warning(f"Rate limit hit for chunk {i}: {e}")
+                    if attempt < max_retries - 1:
+                        # Wait as long as the server asked for, if it said so
+                        delay = server_retry_delay(e)
+                        if delay is None:
+                            # Jitter keeps concurrently throttled chunks from retrying in lockstep
+                            delay = min(max_retry_delay, retry_delay * 2 ** attempt) * random.uniform(0.8, 1.2)
+                        logger.info(f"Retrying in {delay:.1f}s...")
+                        time.sleep(delay)
+                        continue
+
+                # If not rate limit or retries exhausted, re-raise to handle as failure
+                logger.error(f"Failed to process chunk {i} on attempt {attempt+1}: {e}")
+                if attempt < max_retries - 1 and not is_fatal_error(e):
+                    # Empty or malformed responses usually succeed on a quick retry;
+                    # GeminiClient has already backed off on server errors
+                    time.sleep(transient_retry_delay * 2 ** attempt)
+                    continue
+
+                # Final failure (retries exhausted, or an error a retry cannot fix)
+                break
+
+        logger.error("Inserting silence for failed chunk to maintain sync.")
+        return {
+            'audio': AudioSegment.silent(duration=chunk_ms, frame_rate=_TTS_FRAME_RATE),
+            'start': chunk_start
+        }
@@ -1,3 +1,4 @@
+import atexit
 import pytest
 from unittest.mock import MagicMock
 import sys
@@ -8,11 +9,32 @@ sys.path.append(str(Path(__file__).parent.parent))
 
 from speech_translator.config import Config
 
+
+@pytest.fixture(autouse=True)
+def isolated_temp_dir(tmp_path, mocker):
+    """Keeps temp files and caches of every test inside its own tmp_path."""
+    mocker.patch.object(Config, 'TEMP_DIR', tmp_path / "temp_audio")
+    return Config.TEMP_DIR
+
+
+@pytest.fixture(autouse=True)
+def fresh_gemini_singleton():
+    """get_client() caches one GeminiClient per process; tests must not share it."""
+    from speech_translator.core.gemini import get_client
+    get_client.cache_clear()
+    yield
+    if get_client.cache_info().currsize:
+        atexit.unregister(get_client().close)
+    get_client.cache_clear()
+
+
 @pytest.fixture
 def mock_gemini_client(mocker):
     """Mocks the Google Gemini Client."""
     # Mock the entire google.genai module to prevent actual network calls
     mock_genai = mocker.patch("speech_translator.core.gemini.genai")
+    # Send test audio as-is instead of re-encoding it with ffmpeg
+    mocker.patch.object(Config, 'UPLOAD_AUDIO_CODEC', 'original')
     
     # Create the client mock
     mock_client_instance = MagicMock()
@@ -39,6 +61,7 @@ def mock_gemini_client(mocker):
     
     return mock_client_instance
 
+
 @pytest.fixture
 def mock_audio_processor(mocker):
     """Mocks the AudioProcessor and underlying pydub/ffmpeg calls."""
@@ -63,6 +86,7 @@ def mock_audio_processor(mocker):
     # But often we want to test AudioProcessor logic while mocking AudioSegment
     return mock_audio_content
 
+
 @pytest.fixture
 def mock_config(mocker):
     """Allows temporarily overriding Config values."""
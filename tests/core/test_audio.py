@@ -1,6 +1,10 @@
 import pytest
+import numpy as np
 from unittest.mock import MagicMock, patch
-from speech_translator.core.audio import AudioProcessor
+from pydub import AudioSegment
+from speech_translator.core.audio import AudioBuffer, AudioProcessor, SpeechChunk
+from speech_translator.config import Config
+
 
 class TestAudioProcessor:
     
@@ -14,65 +18,488 @@ class TestAudioProcessor:
         assert res == "audio_obj"
         mock_audio_segment.from_file.assert_called_with("test.mp3")
 
-    @patch("speech_translator.core.audio.AudioSegment")
-    def test_trim_silence(self, mock_audio_segment):
-        """Test silence trimming logic."""
+    @pytest.mark.parametrize("frame_rate,channels", [(24000, 1), (44100, 2), (22050, 1)])
+    def test_trim_silence_matches_pydub_loop(self, frame_rate, channels):
+        """The vectorized trim cuts exactly where pydub's per-window dBFS loop does."""
+        def detect_leading_silence(sound, silence_threshold, chunk_size):
+            trim_ms = 0
+            while trim_ms < len(sound) and sound[trim_ms:trim_ms+chunk_size].dBFS < silence_threshold:
+                trim_ms += chunk_size
+            return trim_ms
+
+        rng = np.random.default_rng(frame_rate)
+
+        def noise(ms, amplitude):
+            frames = frame_rate * ms // 1000
+            return AudioSegment(
+                data=rng.integers(-amplitude, amplitude + 1, frames * channels, dtype=np.int16).tobytes(),
+                sample_width=2, frame_rate=frame_rate, channels=channels
+            )
+        audio = noise(237, 3) + noise(801, 8000) + noise(40, 40) + noise(333, 2)
+
+        start = detect_leading_silence(audio, -50.0, 10)
+        end = detect_leading_silence(audio.reverse(), -50.0, 10)
+        expected = audio[start:len(audio)-end]
+
+        result = AudioProcessor.trim_silence(audio)
+        assert 0 < start and 0 < end
+        assert result.raw_data == expected.raw_data
+
+    def test_trim_silence_keeps_loud_audio(self):
+        audio = AudioSegment(
+            data=(np.sin(np.arange(4800) / 3) * 10000).astype(np.int16).tobytes(),
+            sample_width=2, frame_rate=24000, channels=1
+        )
+        assert AudioProcessor.trim_silence(audio).raw_data == audio.raw_data
+
+    @pytest.fixture(autouse=True)
+    def temp_dir(self, tmp_path):
+        with patch.object(Config, 'TEMP_DIR', tmp_path):
+            yield tmp_path
+
+    def test_detect_speech_intervals(self):
+        """Test splitting audio into chunks."""
         ap = AudioProcessor()
-        # trim_silence logic relies on detecting silence loops. 
-        # mocking dBFS behavior on slices is complex.
-        # We assume the logic is correct if it returns a segment.
-        # Here we just verify it handles the object and returns something.
+        # 10s @ 8kHz: tone 0-4s, silence 4-5s, tone 5-9s, silence 9-10s
+        rate = 8000
+        t = np.arange(4 * rate) / rate
+        tone = (np.sin(2 * np.pi * 440 * t) * 10000).astype(np.int16)
+        silence = np.zeros(rate, dtype=np.int16)
+        samples = np.concatenate([tone, silence, tone, silence])
+        audio = AudioSegment(data=samples.tobytes(), sample_width=2, frame_rate=rate, channels=1)
+
+        # Set target_chunk_len_sec to 0 to force NO merge
+        chunks = ap.detect_speech_intervals(audio, min_silence_len=500, target_chunk_len_sec=0)
+
+        assert len(chunks) == 2
+        assert chunks[0]['start'] == 0
+        assert chunks[0]['end'] == 4000
+        assert chunks[1]['start'] == 5000
+        assert chunks[1]['end'] == 9000
+        assert len(chunks[1]['audio']) == 4000
+
+    def test_detect_speech_intervals_uses_cache(self):
+        """A second scan of the same audio reuses the cached chunk ranges."""
+        ap = AudioProcessor()
+        audio = AudioSegment(data=b"\x10\x00" * 8000, sample_width=2, frame_rate=8000, channels=1)
         
-        mock_audio = MagicMock()
-        mock_audio.__len__.return_value = 5000
-        # return itself when sliced
-        mock_audio.__getitem__.return_value = mock_audio
-        mock_audio.dBFS = -20.0 # loud enough to not trim
+        first = ap.detect_speech_intervals(audio)
+        with patch.object(AudioProcessor, "_iter_nonsilent") as mock_detect:
+            second = ap.detect_speech_intervals(audio)
+            mock_detect.assert_not_called()
         
-        # Test runs without error
-        res = ap.trim_silence(mock_audio)
-        assert res is not None
+        assert [(c['start'], c['end']) for c in second] == [(c['start'], c['end']) for c in first]
+        assert second[0]['audio'].raw_data == audio.raw_data
 
-    @patch("speech_translator.core.audio.AudioSegment")
-    def test_detect_speech_intervals(self, mock_audio_segment):
-        """Test splitting audio into chunks."""
+    def test_intervals_cache_key_covers_the_whole_recording(self):
+        """Recordings that only differ after the first megabyte get their own entries."""
+        head = b"\x10\x00" * 600_000
+        audio = AudioSegment(data=head + b"\x00\x00", sample_width=2, frame_rate=8000, channels=1)
+        other = AudioSegment(data=head + b"\x7f\x00", sample_width=2, frame_rate=8000, channels=1)
+
+        key = AudioProcessor._intervals_cache_key(audio, 500, -14, 300)
+        assert key != AudioProcessor._intervals_cache_key(other, 500, -14, 300)
+
+    def test_detect_speech_intervals_cache_is_size_bounded(self):
+        """Interval entries go through DiskCache, so old ones are evicted."""
+        audio = AudioSegment(data=b"\x10\x00" * 8000, sample_width=2, frame_rate=8000, channels=1)
+
+        with patch("speech_translator.core.audio._INTERVALS_CACHE_BYTES", 1):
+            AudioProcessor.detect_speech_intervals(audio)
+
+        assert not any((Config.TEMP_DIR / "intervals_cache").iterdir())
+
+    def test_dbfs_matches_pydub_and_is_cached(self):
+        """NumPy dBFS agrees with pydub and is computed only once per segment."""
+        rng = np.random.default_rng(2)
+        audio = AudioSegment(
+            data=rng.integers(-5000, 5000, 16000, dtype=np.int16).tobytes(),
+            sample_width=2, frame_rate=8000, channels=2
+        )
+        assert AudioProcessor._dbfs(audio) == pytest.approx(audio.dBFS, abs=0.01)
+
+        with patch("speech_translator.core.audio.np.frombuffer") as mock_frombuffer:
+            AudioProcessor._dbfs(audio)
+            mock_frombuffer.assert_not_called()
+
+        silent = AudioSegment(data=b"\x00\x00" * 100, sample_width=2, frame_rate=8000, channels=1)
+        assert AudioProcessor._dbfs(silent) == -float("inf")
+
+    def test_audio_buffer_views(self):
+        """AudioBuffer wraps PCM without copying and round-trips to pydub."""
+        samples = np.arange(2000, dtype=np.int16)
+        audio = AudioSegment(data=samples.tobytes(), sample_width=2, frame_rate=1000, channels=2)
+
+        buffer = AudioBuffer.from_pydub(audio)
+        assert AudioBuffer.from_pydub(audio) is buffer
+        assert buffer.samples.shape == (1000, 2)
+        assert not buffer.samples.flags.owndata
+
+        part = buffer.slice_ms(100, 200)
+        assert np.shares_memory(part.samples, buffer.samples)
+        assert part.to_pydub().raw_data == audio[100:200].raw_data
+        assert np.array_equal(buffer.mono[:2], [0.5, 2.5])
+
+    def test_speech_chunk_is_lazy(self):
+        """Chunk audio is sliced once, on first access, and is part of the mapping like any other key."""
+        audio = AudioSegment(data=b"\x10\x00" * 8000, sample_width=2, frame_rate=8000, channels=1)
+        chunk = SpeechChunk(audio, 250, 500)
+
+        with patch.object(AudioProcessor, "_slice_ms", wraps=AudioProcessor._slice_ms) as mock_slice:
+            assert 'audio' in chunk
+            mock_slice.assert_not_called()
+            first = chunk.get('audio')
+            assert len(first) == 250
+            assert chunk['audio'] is first
+            mock_slice.assert_called_once_with(audio, 250, 500)
+        assert chunk.get('missing') is None
+        with pytest.raises(KeyError):
+            chunk['missing']
+        assert list(chunk) == ['audio', 'start', 'end']
+        assert len(chunk) == 3
+        assert dict(chunk) == {'audio': first, 'start': 250, 'end': 500}
+        assert (chunk.audio, chunk.start, chunk.end) == (first, 250, 500)
+
+    def test_slice_ms_matches_pydub(self):
+        """Byte-offset slicing gives the same frames as pydub's __getitem__."""
+        rng = np.random.default_rng(1)
+        audio = AudioSegment(
+            data=rng.integers(-1000, 1000, 2 * 44100, dtype=np.int16).tobytes(),
+            sample_width=2, frame_rate=44100, channels=2
+        )
+        for start, end in [(0, 1000), (123, 457), (999, 1000)]:
+            assert AudioProcessor._slice_ms(audio, start, end).raw_data == audio[start:end].raw_data
+
+    def test_detect_speech_intervals_silent_audio(self):
+        """Fully silent audio is returned as a single chunk."""
+        ap = AudioProcessor()
+        audio = AudioSegment(data=b"\x00\x00" * 8000, sample_width=2, frame_rate=8000, channels=1)
+
+        chunks = ap.detect_speech_intervals(audio)
+
+        assert len(chunks) == 1
+        assert chunks[0]['start'] == 0
+        assert chunks[0]['end'] == 1000
+
+    @pytest.mark.parametrize("crossfade", [0, 10])
+    def test_merge_segments(self, crossfade):
+        """Bulk merge matches pydub's sequential append."""
+        ap = AudioProcessor()
+        rng = np.random.default_rng(0)
+        segments = [
+            AudioSegment(
+                data=rng.integers(-1000, 1000, 800, dtype=np.int16).tobytes(),
+                sample_width=2, frame_rate=8000, channels=1
+            )
+            for _ in range(3)
+        ]
+
+        expected = segments[0]
+        for seg in segments[1:]:
+            expected = expected.append(seg, crossfade=crossfade)
+
+        res = ap.merge_segments(segments, crossfade=crossfade)
+        assert res.raw_data == expected.raw_data
+        assert len(ap.merge_segments([])) == 0
+
+    def test_overlay_segments_matches_pydub_overlay(self):
+        rng = np.random.default_rng(0)
+
+        def tone(ms, rate, channels=1):
+            frames = rate * ms // 1000
+            return AudioSegment(
+                data=rng.integers(-20000, 20000, frames * channels, dtype=np.int16).tobytes(),
+                sample_width=2, frame_rate=rate, channels=channels
+            )
+        placements = [(tone(300, 24000), 0), (tone(200, 24000), 250), (tone(400, 24000), 800)]
+
+        expected = AudioSegment.silent(duration=1000)
+        for segment, position in placements:
+            expected = expected.overlay(segment, position=position)
+        result = AudioProcessor.overlay_segments(1000, placements)
+
+        assert (result.frame_rate, result.channels) == (expected.frame_rate, expected.channels)
+        assert len(result) == len(expected)
+        assert result.raw_data == expected.raw_data
+
+    def test_overlay_segments_like_matches_converted_track(self):
+        """With like=, the track is built in that format instead of converted afterwards."""
+        voice = AudioSegment(
+            data=(np.sin(np.arange(4800) / 7) * 8000).astype(np.int16).tobytes(),
+            sample_width=2, frame_rate=24000, channels=1
+        )
+        original = AudioSegment.silent(duration=1000, frame_rate=48000).set_channels(2)
+
+        result = AudioProcessor.overlay_segments(1000, [(voice, 200)], like=original)
+        expected = AudioProcessor.overlay_segments(1000, [(voice, 200)]) \
+            .set_frame_rate(48000).set_channels(2)
+
+        assert (result.frame_rate, result.channels, result.sample_width) == (48000, 2, 2)
+        assert len(result) == 1000
+        # Resampling the whole track may drop a trailing frame, and the resampler's edge
+        # differs at the segment end; everything else matches
+        ours = np.frombuffer(result.raw_data, np.int16).astype(int)
+        theirs = np.frombuffer(expected.raw_data, np.int16).astype(int)
+        n = min(len(ours), len(theirs))
+        assert np.count_nonzero(np.abs(ours[:n] - theirs[:n]) > 2) <= 2
+
+    def test_overlay_segments_empty(self):
+        result = AudioProcessor.overlay_segments(500, [])
+        assert len(result) == 500
+        assert result.rms == 0
+
+    def test_apply_ducking(self):
+        """Original is attenuated only where the voice-over is active."""
+        ap = AudioProcessor()
+        rate = 8000
+        original = AudioSegment(
+            data=np.full(2 * rate, 10000, dtype=np.int16).tobytes(),
+            sample_width=2, frame_rate=rate, channels=1
+        )
+        # Voice only in the second half
+        voice_samples = np.concatenate([np.zeros(rate, np.int16), np.full(rate, 1000, np.int16)])
+        voice = AudioSegment(data=voice_samples.tobytes(), sample_width=2, frame_rate=rate, channels=1)
+
+        res = ap.apply_ducking(original, voice, threshold_db=-20)
+        out = np.frombuffer(res.raw_data, dtype=np.int16)
+
+        assert len(res) == len(original)
+        # Untouched before the voice starts
+        assert np.all(out[:rate // 2] == 10000)
+        # -20 dB on the original (10000 -> 1000) plus the voice itself
+        assert np.allclose(out[rate + rate // 2:], 2000, atol=2)
+
+    def test_speed_match(self):
+        """Test speed checking logic."""
         ap = AudioProcessor()
         mock_audio = MagicMock()
-        mock_audio.__len__.return_value = 10000 # 10s
-        mock_audio.dBFS = -20.0
+        mock_audio.frame_rate = 24000
+        mock_audio.sample_width = 2
+        mock_audio.channels = 1
+        mock_audio.raw_data = b"\x00\x00" * 120000
+        mock_audio.__len__.return_value = 5000
         
-        with patch("pydub.silence.detect_nonsilent") as mock_detect:
-            # 2 chunks: 0-4s, 5-9s
-            mock_detect.return_value = [[0, 4000], [5000, 9000]]
+        with patch("subprocess.Popen") as mock_popen, \
+             patch("speech_translator.core.audio.AudioSegment") as mock_audio_segment:
+
+            mock_popen.return_value.returncode = 0
+            mock_popen.return_value.communicate.return_value = (b"\x00\x00" * 60000, b"")
+            mock_audio_segment.return_value = "processed_audio"
+
+            res = ap.speed_match(mock_audio, target_duration_sec=2.5)
+            assert res == "processed_audio"
             
-            mock_audio.__getitem__.return_value = MagicMock()
+            # PCM goes through stdin/stdout pipes, no temp files
+            cmd = mock_popen.call_args[0][0]
+            assert cmd[cmd.index("-i") + 1] == "pipe:0"
+            assert cmd[-1] == "pipe:1"
+            mock_popen.return_value.communicate.assert_called_with(mock_audio.raw_data)
+            mock_audio_segment.assert_called_with(
+                data=b"\x00\x00" * 60000, sample_width=2, frame_rate=24000, channels=1
+            )
+
+    @pytest.mark.parametrize("factor,expected", [
+        (1.5, "atempo=1.500000"),
+        (0.5, "atempo=0.500000"),
+        (2.0, "atempo=2.000000"),
+        (3.0, "atempo=1.732051,atempo=1.732051"),
+        (0.3, "atempo=0.547723,atempo=0.547723"),
+    ])
+    def test_atempo_chain(self, factor, expected):
+        """Each atempo stage stays within ffmpeg's 0.5-2.0 range."""
+        assert AudioProcessor._atempo_chain(factor) == expected
+
+    def test_speed_match_near_identity_skips_ffmpeg(self):
+        """Tiny drifts are ignored and slightly short segments are padded with silence."""
+        ap = AudioProcessor()
+        audio = AudioSegment(data=b"\x01\x00" * 9900, sample_width=2, frame_rate=1000, channels=1)
+
+        with patch("subprocess.Popen") as mock_popen:
+            assert ap.speed_match(audio, target_duration_sec=9.91) is audio
             
-            # Set target_chunk_len_sec to 0 to force NO merge
-            chunks = ap.detect_speech_intervals(mock_audio, min_silence_len=500, target_chunk_len_sec=0)
+            padded = ap.speed_match(audio, target_duration_sec=10.0)
+            assert len(padded) == 10000
+            assert padded.raw_data[:len(audio.raw_data)] == audio.raw_data
+            assert padded.raw_data[len(audio.raw_data):] == b"\x00" * 200
             
-            assert len(chunks) == 2
-            assert chunks[0]['start'] == 0
-            assert chunks[1]['start'] == 5000
+            mock_popen.assert_not_called()
 
-    def test_speed_match(self):
-        """Test speed checking logic."""
+    def test_speed_match_without_ffmpeg_uses_librosa(self):
+        """Missing ffmpeg falls back to librosa's time stretch, if installed."""
+        ap = AudioProcessor()
+        audio = AudioSegment(data=b"\x10\x00" * 4000, sample_width=2, frame_rate=1000, channels=1)
+        fake_librosa = MagicMock()
+        fake_librosa.effects.time_stretch.side_effect = lambda y, rate: y[:, :int(y.shape[1] / rate)]
+
+        with patch("subprocess.Popen", side_effect=FileNotFoundError), \
+             patch.dict("sys.modules", {"librosa": fake_librosa}):
+            res = ap.speed_match(audio, target_duration_sec=2.0)
+
+        assert len(res) == 2000
+        assert res.raw_data == b"\x10\x00" * 2000
+
+        with patch("subprocess.Popen", side_effect=FileNotFoundError), \
+             patch.dict("sys.modules", {"librosa": None}):
+            assert ap.speed_match(audio, target_duration_sec=2.0) is audio
+
+    def test_speed_match_ffmpeg_failure(self):
+        """Original segment is returned when ffmpeg fails."""
         ap = AudioProcessor()
         mock_audio = MagicMock()
         mock_audio.frame_rate = 24000
-        mock_audio.set_frame_rate.return_value = mock_audio
+        mock_audio.sample_width = 2
+        mock_audio.channels = 1
         mock_audio.__len__.return_value = 5000
         
-        with patch("subprocess.run") as mock_run, \
-             patch("speech_translator.core.audio.AudioSegment.export") as mock_export, \
-             patch("speech_translator.core.audio.AudioSegment.from_file") as mock_from_file, \
-             patch("os.remove") as mock_remove:
-                 
+        with patch("subprocess.Popen") as mock_popen:
+            mock_popen.return_value.returncode = 1
+            mock_popen.return_value.communicate.return_value = (b"", b"error")
+
+            res = ap.speed_match(mock_audio, target_duration_sec=2.5)
+            assert res is mock_audio
+
+    def test_speed_match_many_preserves_order(self):
+        """Concurrent speed matching returns results in input order."""
+        ap = AudioProcessor()
+        segments = [MagicMock(name=f"seg{i}") for i in range(4)]
+
+        with patch.object(AudioProcessor, "speed_match", side_effect=lambda seg, target: (seg, target)):
+            res = ap.speed_match_many([(seg, float(i)) for i, seg in enumerate(segments)])
+
+        assert res == [(seg, float(i)) for i, seg in enumerate(segments)]
+        assert ap.speed_match_many([]) == []
+
+    def test_load_audio_stream(self):
+        """Remote media is decoded through ffmpeg's stdout, request headers before the input."""
+        pcm = np.arange(960, dtype=np.int16).tobytes()
+        with patch("subprocess.run") as mock_run:
+            mock_run.return_value = MagicMock(returncode=0, stdout=pcm)
+            segment = AudioProcessor.load_audio_stream("https://cdn/a", 48000, 2, headers={"Referer": "r"})
+
+        cmd = mock_run.call_args.args[0]
+        assert cmd.index("-headers") < cmd.index("-i")
+        assert cmd[cmd.index("-headers") + 1] == "Referer: r\r\n"
+        assert cmd[-1] == "pipe:1"
+        assert (segment.frame_rate, segment.channels, segment.raw_data) == (48000, 2, pcm)
+
+        with patch("subprocess.run") as mock_run:
+            mock_run.return_value = MagicMock(returncode=1, stderr=b"403 Forbidden")
+            with pytest.raises(RuntimeError, match="403"):
+                AudioProcessor.load_audio_stream("https://cdn/a", 48000, 2)
+
+    def test_merge_video_audio(self):
+        """ffmpeg output is only decoded when the merge fails."""
+        ap = AudioProcessor()
+
+        with patch("subprocess.run") as mock_run:
             mock_run.return_value.returncode = 0
-            mock_from_file.return_value = "processed_audio"
+            ap.merge_video_audio("in.mp4", "voice.wav", "out.mp4")
+
+            cmd = mock_run.call_args[0][0]
+            assert cmd[cmd.index("-loglevel") + 1] == "error"
+            assert cmd[-1] == "out.mp4"
             
-            # Mock file existence for temp output check
-            with patch("pathlib.Path.exists", return_value=True):
-                 res = ap.speed_match(mock_audio, target_duration_sec=2.5)
-                 assert res == "processed_audio"
-                 mock_run.assert_called()
-                 mock_remove.assert_called()
+            mock_run.return_value.returncode = 1
+            mock_run.return_value.stderr = b"bad \xff input"
+            with pytest.raises(RuntimeError, match="bad"):
+                ap.merge_video_audio("in.mp4", "voice.wav", "out.mp4")
+
+    def test_merge_video_audio_from_bytes(self):
+        """In-memory audio is piped to ffmpeg's stdin."""
+        with patch("subprocess.run") as mock_run:
+            mock_run.return_value.returncode = 0
+            AudioProcessor.merge_video_audio("in.mp4", None, "out.mp4", audio_data=b"RIFF....")
+
+            cmd = mock_run.call_args[0][0]
+            assert cmd[cmd.index("in.mp4") + 2] == "pipe:0"
+            assert mock_run.call_args.kwargs["input"] == b"RIFF...."
+
+    def test_merge_video_audio_requires_audio(self):
+        with patch("subprocess.run") as mock_run:
+            with pytest.raises(ValueError):
+                AudioProcessor.merge_video_audio("in.mp4", None, "out.mp4")
+        mock_run.assert_not_called()
+
+    def test_encode_for_recognition(self):
+        """Audio for the speech model is re-encoded as 16 kHz mono Opus."""
+        ap = AudioProcessor()
+
+        with patch("subprocess.run") as mock_run:
+            mock_run.return_value = MagicMock(returncode=0, stdout=b"OggS...")
+            data, mime_type = ap.encode_for_recognition(b"mp3 bytes")
+
+            assert (data, mime_type) == (b"OggS...", "audio/ogg")
+            cmd = mock_run.call_args[0][0]
+            assert cmd[cmd.index("-ar") + 1] == "16000"
+            assert cmd[cmd.index("-ac") + 1] == "1"
+            assert cmd[cmd.index("-c:a") + 1] == "libopus"
+            assert mock_run.call_args.kwargs['input'] == b"mp3 bytes"
+
+    def test_encode_for_recognition_fallbacks(self):
+        """A failed Opus encode falls back to MP3; without ffmpeg the original bytes are kept."""
+        ap = AudioProcessor()
+
+        with patch("subprocess.run") as mock_run:
+            mock_run.side_effect = [
+                MagicMock(returncode=1, stdout=b"", stderr=b"Unknown encoder 'libopus'"),
+                MagicMock(returncode=0, stdout=b"mp3 small"),
+            ]
+            assert ap.encode_for_recognition(b"mp3 bytes") == (b"mp3 small", "audio/mpeg")
+            assert mock_run.call_args[0][0][mock_run.call_args[0][0].index("-c:a") + 1] == "libmp3lame"
+
+        with patch("subprocess.run", side_effect=FileNotFoundError):
+            assert ap.encode_for_recognition(b"mp3 bytes") == (b"mp3 bytes", "audio/mpeg")
+
+        assert ap.encode_for_recognition(b"mp3 bytes", codec="original") == (b"mp3 bytes", "audio/mpeg")
+        assert ap.encode_for_recognition(b"RIFF wav", codec="original") == (b"RIFF wav", "audio/wav")
+
+    def test_is_silent(self):
+        quiet = AudioSegment.silent(duration=500, frame_rate=16000)
+        tone = AudioSegment(
+            data=(np.sin(np.arange(8000) / 5) * 12000).astype(np.int16).tobytes(),
+            sample_width=2, frame_rate=16000, channels=1
+        )
+        assert AudioProcessor.is_silent(quiet)
+        assert not AudioProcessor.is_silent(tone)
+        assert AudioProcessor.is_silent(tone, threshold_db=0.0)
+
+    def test_is_silent_by_peak(self):
+        # Steady hum at about -40 dBFS: above the average threshold, below the peak threshold
+        hum = AudioSegment(
+            data=(np.sin(np.arange(8000) / 5) * 330).astype(np.int16).tobytes(),
+            sample_width=2, frame_rate=16000, channels=1
+        )
+        assert not AudioProcessor.is_silent(hum, threshold_db=-50.0)
+        assert AudioProcessor.is_silent(hum, threshold_db=-50.0, peak_threshold_db=-35.0)
+        assert not AudioProcessor.is_silent(hum, threshold_db=-50.0, peak_threshold_db=-45.0)
+
+    @pytest.mark.parametrize("data,expected", [
+        (b'RIFF\x24\x00\x00\x00WAVE', "wav"),
+        (b'ID3\x04\x00\x00', "mp3"),
+        (b'OggS\x00\x02', "ogg"),
+        (b'\xFF\xFB\x90\x64', "mp3"),  # MPEG-1 layer III, 128 kbps, 44.1 kHz
+        (b'\xFF\xF3\x48\xC4', "mp3"),  # MPEG-2 layer III
+        (b'\xFF\xFF\xFF\xFF', "pcm"),  # PCM samples of -1, invalid bitrate index
+        (b'\xFF\xEB\x90\x64', "pcm"),  # reserved MPEG version
+        (b'\x00\x00\x01\x00', "pcm"),
+        (b'', "pcm"),
+    ])
+    def test_detect_audio_format(self, data, expected):
+        assert AudioProcessor.detect_audio_format(data) == expected
+        assert AudioProcessor.is_raw_pcm(data) == (expected == "pcm")
+
+    def test_load_audio_bytes_raw_pcm(self):
+        pcm = np.arange(2400, dtype=np.int16).tobytes()
+        segment = AudioProcessor.load_audio_bytes(pcm)
+        assert segment.frame_rate == 24000
+        assert len(segment) == 100
+        assert segment.raw_data == pcm
+
+    def test_load_audio_bytes_wav_roundtrip(self):
+        tone = AudioSegment(
+            data=np.arange(1600, dtype=np.int16).tobytes(),
+            sample_width=2, frame_rate=16000, channels=1
+        )
+        segment = AudioProcessor.load_audio_bytes(AudioProcessor.encode_audio(tone, format="wav"))
+        assert segment.frame_rate == 16000
+        assert segment.raw_data == tone.raw_data
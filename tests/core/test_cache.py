@@ -0,0 +1,32 @@
+import os
+from speech_translator.core.cache import DiskCache
+
+
+def test_get_set_roundtrip(tmp_path):
+    cache = DiskCache(tmp_path / "cache", max_bytes=1024)
+    assert cache.get("missing") is None
+    cache.set("key.bin", b"payload")
+    assert cache.get("key.bin") == b"payload"
+
+
+def test_disabled_cache_stores_nothing(tmp_path):
+    cache = DiskCache(tmp_path / "cache", max_bytes=0)
+    cache.set("key.bin", b"payload")
+    assert cache.get("key.bin") is None
+    assert not (tmp_path / "cache").exists()
+
+
+def test_evicts_least_recently_used(tmp_path):
+    cache = DiskCache(tmp_path / "cache", max_bytes=25)
+    cache.set("a", b"x" * 10)
+    cache.set("b", b"x" * 10)
+    # Make "a" older, then use it so "b" becomes the LRU entry
+    os.utime(tmp_path / "cache" / "a", (1, 1))
+    os.utime(tmp_path / "cache" / "b", (2, 2))
+    assert cache.get("a") is not None
+
+    cache.set("c", b"x" * 10)
+
+    assert cache.get("b") is None
+    assert cache.get("a") is not None
+    assert cache.get("c") is not None
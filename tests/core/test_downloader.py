@@ -0,0 +1,52 @@
+import pytest
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+from speech_translator.core.downloader import download_content, resolve_audio_stream
+
+
+def _fake_youtube_dl(instances):
+    def factory(opts):
+        ydl = MagicMock()
+        ydl.__enter__.return_value = ydl
+        ydl.extract_info.side_effect = lambda url, download: {"id": url.rsplit("/", 1)[-1]}
+        ydl.prepare_filename.side_effect = lambda info: f"/downloads/{info['id']}.webm"
+        ydl.opts = opts
+        instances.append(ydl)
+        return ydl
+    return factory
+
+
+def test_download_content(tmp_path):
+    instances = []
+    with patch("speech_translator.core.downloader.yt_dlp.YoutubeDL", side_effect=_fake_youtube_dl(instances)):
+        result = download_content("https://example.com/v1", tmp_path, prefer_video=True)
+
+    assert result == Path("/downloads/v1.webm")
+    assert instances[0].opts['format'] == 'bestvideo+bestaudio/best'
+
+
+def test_resolve_audio_stream_does_not_download():
+    info = {"url": "https://cdn.example.com/audio", "asr": 48000, "audio_channels": 2, "http_headers": {}}
+    ydl = MagicMock()
+    ydl.__enter__.return_value = ydl
+    ydl.extract_info.return_value = info
+
+    with patch("speech_translator.core.downloader.yt_dlp.YoutubeDL", return_value=ydl) as mock_ydl:
+        assert resolve_audio_stream("https://example.com/v1") is info
+
+    ydl.extract_info.assert_called_once_with("https://example.com/v1", download=False)
+    assert mock_ydl.call_args.args[0]['format'] == 'bestaudio/best'
+
+
+@pytest.mark.parametrize("info", [
+    {"requested_formats": [{}, {}], "url": None},
+    {"url": "https://cdn.example.com/manifest", "fragments": [{"path": "seg1"}]},
+])
+def test_resolve_audio_stream_rejects_merged_or_fragmented_formats(info):
+    ydl = MagicMock()
+    ydl.__enter__.return_value = ydl
+    ydl.extract_info.return_value = info
+
+    with patch("speech_translator.core.downloader.yt_dlp.YoutubeDL", return_value=ydl):
+        with pytest.raises(ValueError):
+            resolve_audio_stream("https://example.com/v1")
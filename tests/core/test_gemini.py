@@ -1,7 +1,9 @@
 import pytest
 from unittest.mock import MagicMock, patch
-from speech_translator.core.gemini import GeminiClient
+from speech_translator.core.gemini import GeminiClient, is_fatal_error
 from google.genai import types
+from speech_translator.config import Config
+
 
 class TestGeminiClient:
     
@@ -12,6 +14,18 @@ class TestGeminiClient:
         assert client.thinking_model == mock_config.THINKING_MODEL
         assert client.tts_model == mock_config.TTS_MODEL
 
+    def test_init_reuses_keepalive_pool(self, mock_gemini_client):
+        """The SDK client is created once with a keep-alive connection pool and closed on exit."""
+        with patch("speech_translator.core.gemini.genai.Client", return_value=mock_gemini_client) as mock_client_cls:
+            with GeminiClient() as client:
+                assert client.client is mock_gemini_client
+
+        mock_client_cls.assert_called_once()
+        http_options = mock_client_cls.call_args.kwargs['http_options']
+        assert http_options.client_args['limits'].keepalive_expiry == 60
+        assert http_options.client_args['limits'].max_keepalive_connections == 32
+        mock_gemini_client.close.assert_called_once()
+
     def test_list_models(self, mock_gemini_client):
         """Test listing models."""
         client = GeminiClient()
@@ -19,6 +33,21 @@ class TestGeminiClient:
         assert len(models) == 2
         mock_gemini_client.models.list.assert_called_once()
 
+    def test_list_models_cached_with_ttl(self, mock_gemini_client):
+        """Repeated listings reuse the snapshot until it expires or is refreshed."""
+        client = GeminiClient()
+        with patch("speech_translator.core.gemini.time.monotonic", return_value=1000.0):
+            assert client.list_models() == client.list_models()
+        assert mock_gemini_client.models.list.call_count == 1
+
+        expired = 1000.0 + GeminiClient.MODELS_CACHE_TTL_SEC + 1
+        with patch("speech_translator.core.gemini.time.monotonic", return_value=expired):
+            client.list_models()
+        assert mock_gemini_client.models.list.call_count == 2
+
+        client.refresh_models()
+        assert mock_gemini_client.models.list.call_count == 3
+
     def test_translate_audio_auto_voice(self, mock_gemini_client, tmp_path):
         """Test Step 1: Translation with Auto voice selection."""
         client = GeminiClient()
@@ -110,6 +139,42 @@ class TestGeminiClient:
         voice_name = kwargs_2['config'].speech_config.voice_config.prebuilt_voice_config.voice_name
         assert voice_name == "Kore"
 
+    def test_translate_audio_json_error_not_cached(self, mock_gemini_client):
+        """The raw-text fallback is spoken once; neither its translation nor its audio is cached."""
+        client = GeminiClient()
+        mock_response_1 = MagicMock()
+        mock_response_1.text = "Not JSON data"
+        mock_gemini_client.models.generate_content.return_value = mock_response_1
+
+        with patch.object(client, "_generate_tts", return_value=b"audio") as mock_tts:
+            client.translate_audio_bytes(b"audio", "English", voice_name="Auto", duration_hint_sec=5.0)
+            client.translate_audio_bytes(b"audio", "English", voice_name="Auto", duration_hint_sec=5.0)
+
+        assert mock_gemini_client.models.generate_content.call_count == 2
+        assert mock_tts.call_count == 2
+
+    def test_translate_audio_structured_output(self, mock_gemini_client, tmp_path):
+        """Both Step 1 variants request schema-constrained JSON and use the SDK-parsed result."""
+        from speech_translator.core.gemini import TranslationResult
+        client = GeminiClient()
+        audio_file = tmp_path / "test.mp3"
+        audio_file.write_bytes(b"dummy")
+
+        mock_response_1 = MagicMock()
+        mock_response_1.text = '{"text": "ignored"}'
+        mock_response_1.parsed = TranslationResult(text=" Parsed text ", category="Elderly Man")
+        # TTS is patched below, so only the two Step 1 calls reach the API
+        mock_gemini_client.models.generate_content.side_effect = [mock_response_1, mock_response_1]
+
+        with patch.object(client, "_generate_tts", return_value=b"audio") as mock_tts:
+            client.translate_audio(str(audio_file), "English", voice_name="Auto", duration_hint_sec=5.0)
+            client.translate_audio(str(audio_file), "English", voice_name="Puck", duration_hint_sec=5.0)
+
+        assert mock_tts.call_args_list[0].args == ("Parsed text", "Charon")
+        assert mock_tts.call_args_list[1].args == ("Parsed text", "Puck")
+        for step1_call in mock_gemini_client.models.generate_content.call_args_list:
+            assert step1_call.kwargs['config'].response_schema is TranslationResult
+
     def test_translate_api_failure(self, mock_gemini_client, tmp_path):
         """Test handling of API errors."""
         client = GeminiClient()
@@ -120,3 +185,405 @@ class TestGeminiClient:
         
         with pytest.raises(Exception):
             client.translate_audio(str(audio_file), "En", duration_hint_sec=5.0)
+
+    def test_translate_audio_uses_disk_cache(self, mock_gemini_client, tmp_path):
+        """A repeated chunk is served from the cache without any API call."""
+        client = GeminiClient()
+        audio_file = tmp_path / "test.mp3"
+        audio_file.write_bytes(b"repeated_audio")
+
+        first = client.translate_audio(str(audio_file), "English", voice_name="Auto", duration_hint_sec=5.0)
+        assert mock_gemini_client.models.generate_content.call_count == 2
+
+        second = client.translate_audio(str(audio_file), "English", voice_name="Auto", duration_hint_sec=5.0)
+        assert second == first
+        assert mock_gemini_client.models.generate_content.call_count == 2
+
+        # Different settings are a different cache entry; Step 1 runs again, while the
+        # (mocked, identical) translated text reuses the memoized speech
+        client.translate_audio(str(audio_file), "German", voice_name="Auto", duration_hint_sec=5.0)
+        assert mock_gemini_client.models.generate_content.call_count == 3
+
+    def test_translate_audio_bytes_shares_cache_with_file_path(self, mock_gemini_client, tmp_path):
+        """In-memory audio needs no temp file and hits the same cache entries."""
+        client = GeminiClient()
+        audio_file = tmp_path / "test.mp3"
+        audio_file.write_bytes(b"chunk_audio")
+
+        first = client.translate_audio_bytes(b"chunk_audio", "English", duration_hint_sec=5.0)
+        second = client.translate_audio(str(audio_file), "English", duration_hint_sec=5.0)
+
+        assert first == second == b"fake_audio_bytes"
+        assert mock_gemini_client.models.generate_content.call_count == 2
+
+    def test_translate_audio_bytes_cache_source_keys_the_cache(self, mock_gemini_client):
+        """Differently encoded bytes of the same PCM share one cache entry."""
+        client = GeminiClient()
+
+        first = client.translate_audio_bytes(b"mp3_encode_1", "English", duration_hint_sec=5.0, cache_source=b"pcm")
+        second = client.translate_audio_bytes(b"mp3_encode_2", "English", duration_hint_sec=5.0, cache_source=b"pcm")
+
+        assert first == second == b"fake_audio_bytes"
+        assert mock_gemini_client.models.generate_content.call_count == 2
+
+    def test_translate_audio_step1_cached_when_tts_fails(self, mock_gemini_client, tmp_path):
+        """A retry after a failed TTS call does not repeat the translation request."""
+        client = GeminiClient()
+        audio_file = tmp_path / "test.mp3"
+        audio_file.write_bytes(b"audio")
+
+        with patch.object(client, "_generate_tts", side_effect=[ValueError("TTS down"), b"audio_out"]) as mock_tts:
+            with pytest.raises(ValueError):
+                client.translate_audio(str(audio_file), "English", voice_name="Auto", duration_hint_sec=5.0)
+            result = client.translate_audio(str(audio_file), "English", voice_name="Auto", duration_hint_sec=5.0)
+
+        assert result == b"audio_out"
+        assert mock_gemini_client.models.generate_content.call_count == 1
+        assert mock_tts.call_args.args == ("Translated text", "Kore")
+
+
+def test_read_audio_file_memoized_until_file_changes(tmp_path):
+    """Retries of an unchanged chunk skip the file read; a rewritten chunk is read again."""
+    from speech_translator.core.gemini import _read_audio_file, _read_file_cached
+    audio_file = tmp_path / "chunk.mp3"
+    audio_file.write_bytes(b"first")
+
+    _read_file_cached.cache_clear()
+    assert _read_audio_file(str(audio_file)) == b"first"
+    assert _read_audio_file(str(audio_file)) == b"first"
+    assert _read_file_cached.cache_info().hits == 1
+
+    audio_file.write_bytes(b"second version")
+    assert _read_audio_file(str(audio_file)) == b"second version"
+
+
+def test_large_audio_uses_file_api(mock_gemini_client, tmp_path):
+    """Chunks above INLINE_AUDIO_LIMIT are uploaded, referenced by URI and deleted on close."""
+    client = GeminiClient()
+    audio_file = tmp_path / "big.mp3"
+    audio_file.write_bytes(b"\x00" * (GeminiClient.INLINE_AUDIO_LIMIT + 1))
+
+    uploaded = MagicMock()
+    uploaded.name = "files/abc"
+    uploaded.uri = "https://example.com/files/abc"
+    uploaded.state = types.FileState.ACTIVE
+    mock_gemini_client.files.upload.return_value = uploaded
+
+    client.translate_audio(str(audio_file), "English", voice_name="Auto", duration_hint_sec=5.0)
+
+    mock_gemini_client.files.upload.assert_called_once()
+    step1_parts = mock_gemini_client.models.generate_content.call_args_list[0].kwargs['contents'][0].parts
+    assert step1_parts[0].file_data.file_uri == uploaded.uri
+    assert step1_parts[0].inline_data is None
+    mock_gemini_client.files.delete.assert_not_called()
+
+    client.close()
+    mock_gemini_client.files.delete.assert_called_once_with(name="files/abc")
+
+
+def test_file_api_uploads_are_reused_by_content(mock_gemini_client, tmp_path, mocker):
+    """Identical audio is uploaded once; uploads beyond UPLOAD_CACHE_SIZE are deleted oldest first."""
+    mocker.patch.object(GeminiClient, 'UPLOAD_CACHE_SIZE', 1)
+    client = GeminiClient()
+
+    def upload(file, config):
+        uploaded = MagicMock()
+        uploaded.name = f"files/{mock_gemini_client.files.upload.call_count}"
+        uploaded.uri = f"https://example.com/{uploaded.name}"
+        uploaded.state = types.FileState.ACTIVE
+        return uploaded
+    mock_gemini_client.files.upload.side_effect = upload
+
+    big = b"\x00" * (GeminiClient.INLINE_AUDIO_LIMIT + 1)
+    client.translate_audio_bytes(big, "English", duration_hint_sec=5.0)
+    client.translate_audio_bytes(big, "German", duration_hint_sec=5.0)
+    assert mock_gemini_client.files.upload.call_count == 1
+
+    client.translate_audio_bytes(big + b"\x01", "English", duration_hint_sec=5.0)
+    assert mock_gemini_client.files.upload.call_count == 2
+    mock_gemini_client.files.delete.assert_called_once_with(name="files/1")
+
+
+def test_small_audio_stays_inline(mock_gemini_client, tmp_path):
+    client = GeminiClient()
+    audio_file = tmp_path / "small.mp3"
+    audio_file.write_bytes(b"small")
+
+    client.translate_audio(str(audio_file), "English", voice_name="Auto", duration_hint_sec=5.0)
+
+    mock_gemini_client.files.upload.assert_not_called()
+    step1_parts = mock_gemini_client.models.generate_content.call_args_list[0].kwargs['contents'][0].parts
+    assert step1_parts[0].inline_data.data == b"small"
+
+
+def test_audio_part_uses_encoded_mime_type(mock_gemini_client, tmp_path, mocker):
+    """Step 1 sends the re-encoded audio with its own mime type."""
+    mocker.patch.object(Config, 'UPLOAD_AUDIO_CODEC', 'opus')
+    client = GeminiClient()
+    audio_file = tmp_path / "chunk.mp3"
+    audio_file.write_bytes(b"mp3 bytes")
+
+    with patch("speech_translator.core.gemini.AudioProcessor.encode_for_recognition",
+               return_value=(b"OggS", "audio/ogg")) as mock_encode:
+        client.translate_audio(str(audio_file), "English", voice_name="Auto", duration_hint_sec=5.0)
+
+    mock_encode.assert_called_once_with(b"mp3 bytes", "opus")
+    step1_parts = mock_gemini_client.models.generate_content.call_args_list[0].kwargs['contents'][0].parts
+    assert step1_parts[0].inline_data.data == b"OggS"
+    assert step1_parts[0].inline_data.mime_type == "audio/ogg"
+
+
+@pytest.mark.parametrize("code,fatal", [(400, True), (403, True), (404, True), (408, False), (429, False)])
+def test_is_fatal_error(code, fatal):
+    from google.genai import errors
+    assert is_fatal_error(errors.ClientError(code, {"error": {"code": code}})) is fatal
+
+
+def test_is_fatal_error_ignores_other_exceptions():
+    from google.genai import errors
+    assert not is_fatal_error(errors.ServerError(500, {"error": {"code": 500}}))
+    assert not is_fatal_error(ValueError("No audio data in TTS response"))
+
+
+def test_generate_content_retries_transient_errors(mock_gemini_client):
+    """429/5xx are retried with backoff (honoring RetryInfo); other errors are raised at once."""
+    from google.genai import errors
+    client = GeminiClient()
+    rate_limited = errors.ClientError(429, {"error": {
+        "code": 429, "status": "RESOURCE_EXHAUSTED",
+        "details": [{"@type": "type.googleapis.com/google.rpc.RetryInfo", "retryDelay": "12s"}]
+    }})
+    unavailable = errors.ServerError(503, {"error": {"code": 503, "status": "UNAVAILABLE"}})
+    ok = MagicMock()
+    mock_gemini_client.models.generate_content.side_effect = [rate_limited, unavailable, ok]
+    limiter = MagicMock()
+
+    with patch("speech_translator.core.gemini.time.sleep") as mock_sleep:
+        assert client._generate_content(before_attempt=limiter, model="m") is ok
+
+    assert mock_gemini_client.models.generate_content.call_count == 3
+    assert limiter.call_count == 3
+    delays = [c.args[0] for c in mock_sleep.call_args_list]
+    assert delays[0] == 12.0
+    assert GeminiClient.BACKOFF_MIN_SEC <= delays[1] <= GeminiClient.BACKOFF_MAX_SEC
+
+    mock_gemini_client.models.generate_content.reset_mock()
+    mock_gemini_client.models.generate_content.side_effect = errors.ClientError(400, {"error": {"code": 400}})
+    with pytest.raises(errors.ClientError):
+        client._generate_content(model="m")
+    assert mock_gemini_client.models.generate_content.call_count == 1
+
+
+@pytest.mark.parametrize("message, expected", [
+    ("429 RESOURCE_EXHAUSTED. Please retry in 21.5s.", 21.5),
+    ('429 {"retryDelay": "7s"}', 7.0),
+    ("429 Please retry in 900s", 120.0),
+    ("429 Too Many Requests", None),
+])
+def test_server_retry_delay_from_message(message, expected):
+    from speech_translator.core.gemini import server_retry_delay
+    assert server_retry_delay(Exception(message)) == expected
+
+
+def test_generate_content_gives_up_after_max_attempts(mock_gemini_client):
+    from google.genai import errors
+    client = GeminiClient()
+    mock_gemini_client.models.generate_content.side_effect = errors.ServerError(500, {"error": {"code": 500}})
+
+    with patch("speech_translator.core.gemini.time.sleep"):
+        with pytest.raises(errors.ServerError):
+            client._generate_content(model="m")
+
+    assert mock_gemini_client.models.generate_content.call_count == GeminiClient.MAX_API_ATTEMPTS
+
+
+def test_get_client_returns_one_shared_instance(mock_gemini_client):
+    from speech_translator.core.gemini import get_client
+    assert get_client() is get_client()
+
+
+def test_get_client_closes_client_at_exit(mock_gemini_client, mocker):
+    from speech_translator.core.gemini import get_client
+    mock_atexit = mocker.patch("speech_translator.core.gemini.atexit")
+
+    client = get_client()
+
+    mock_atexit.register.assert_called_once_with(client.close)
+
+
+def test_monologue_voice_map_is_read_only():
+    from speech_translator.core.gemini import _MONOLOGUE_VOICE_MAP
+    assert _MONOLOGUE_VOICE_MAP["Elderly Man"] == "Charon"
+    with pytest.raises(TypeError):
+        _MONOLOGUE_VOICE_MAP["Man"] = "Puck"
+
+
+def test_prompts_are_cached_per_language_and_duration_bucket():
+    from speech_translator.core.gemini import _duration_bucket, _monologue_prompt
+    _monologue_prompt.cache_clear()
+
+    first = _monologue_prompt("English", _duration_bucket(5.04), auto_voice=True)
+    second = _monologue_prompt("English", _duration_bucket(4.96), auto_voice=True)
+
+    assert first is second
+    assert "5.0 seconds" in first
+    assert _monologue_prompt.cache_info().hits == 1
+    # Without a duration hint the duration instruction is left out instead of failing
+    assert "seconds" not in _monologue_prompt("English", _duration_bucket(None), auto_voice=False)
+
+
+def test_translate_audio_rejects_empty_target_lang(mock_gemini_client, tmp_path):
+    client = GeminiClient()
+    audio_file = tmp_path / "chunk.mp3"
+    audio_file.write_bytes(b"audio")
+    with pytest.raises(ValueError):
+        client.translate_audio(str(audio_file), "  ")
+    with pytest.raises(ValueError):
+        client.translate_audio_bytes(b"audio", "")
+    mock_gemini_client.models.generate_content.assert_not_called()
+
+
+def test_rpm_limiter_waits_for_window():
+    from speech_translator.core.gemini import RpmLimiter
+    limiter = RpmLimiter(2, window_sec=60.0)
+    clock = [100.0]
+
+    def advance(sec):
+        clock[0] += sec
+
+    with patch("speech_translator.core.gemini.time.time", side_effect=lambda: clock[0]), \
+         patch("speech_translator.core.gemini.time.sleep", side_effect=advance) as mock_sleep:
+        limiter.wait()
+        limiter.wait()
+        mock_sleep.assert_not_called()
+        limiter.wait()
+
+    assert mock_sleep.call_args.args[0] == pytest.approx(60.1)
+    # Both expired timestamps were dropped
+    assert list(limiter._request_times) == [pytest.approx(160.1)]
+
+    disabled = RpmLimiter(0)
+    with patch("speech_translator.core.gemini.time.sleep") as mock_sleep:
+        for _ in range(100):
+            disabled.wait()
+    mock_sleep.assert_not_called()
+
+
+def test_rpm_limiter_sleeps_without_holding_the_lock():
+    from speech_translator.core.gemini import RpmLimiter
+    limiter = RpmLimiter(1, window_sec=60.0)
+    clock = [100.0]
+
+    def sleep(sec):
+        # Other threads can use the limiter while this one waits
+        assert not limiter._lock.locked()
+        clock[0] += sec
+
+    with patch("speech_translator.core.gemini.time.time", side_effect=lambda: clock[0]), \
+         patch("speech_translator.core.gemini.time.sleep", side_effect=sleep) as mock_sleep:
+        limiter.wait()
+        limiter.wait()
+
+    mock_sleep.assert_called_once()
+    assert list(limiter._request_times) == [pytest.approx(160.1)]
+
+
+def test_thinking_and_tts_use_separate_limiters(mock_gemini_client, tmp_path, mocker):
+    mocker.patch.object(Config, 'THINKING_RPM', 30)
+    mocker.patch.object(Config, 'TTS_RPM', 10)
+    client = GeminiClient()
+    assert client._thinking_limiter.rpm_limit == 30
+    assert client._tts_limiter.rpm_limit == 10
+
+    audio_file = tmp_path / "chunk.mp3"
+    audio_file.write_bytes(b"audio")
+    with patch.object(client._thinking_limiter, "wait") as thinking_wait, \
+         patch.object(client._tts_limiter, "wait") as tts_wait:
+        client.translate_audio(str(audio_file), "English", duration_hint_sec=2.0)
+
+    thinking_wait.assert_called_once()
+    tts_wait.assert_called_once()
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("Yeah....", "Yeah."),
+    ("  Привет... мир  ", "Привет. мир"),
+    ("...", ""),
+    ("_ - !?", ""),
+    ("42", "42"),
+    ("", ""),
+])
+def test_clean_text_for_tts(mock_gemini_client, text, expected):
+    assert GeminiClient()._clean_text_for_tts(text) == expected
+
+
+def test_tts_runs_on_one_shared_pool(mock_gemini_client, mocker):
+    """Dialogue turns of every chunk share the client's TTS threads; close() stops them."""
+    import threading
+    mocker.patch.object(Config, 'TTS_RPM', 3)
+    client = GeminiClient()
+    threads = set()
+
+    def tts(text, voice):
+        threads.add(threading.current_thread().name)
+        return b"\x00\x00"
+
+    # Three voices, so every turn is its own TTS request on the pool
+    mock_gemini_client.models.generate_content.return_value = MagicMock(text=(
+        '{"segments": [{"speaker": "A", "category": "Man", "text": "a"},'
+        ' {"speaker": "B", "category": "Woman", "text": "b"},'
+        ' {"speaker": "C", "category": "Boy", "text": "c"}]}'
+    ))
+    with patch.object(client, "_generate_tts", side_effect=tts), \
+         patch("pydub.AudioSegment.export"):
+        for _ in range(3):
+            client._process_dialogue(b"audio", "English", None)
+
+    assert client._tts_executor._max_workers == 3
+    assert 1 <= len(threads) <= 3
+    assert all(name.startswith("gemini-tts") for name in threads)
+
+    client.close()
+    with pytest.raises(RuntimeError):
+        client._tts_executor.submit(tts, "c", "Kore")
+
+
+def test_generate_tts_memoizes_short_phrases(mock_gemini_client, mocker):
+    mocker.patch.object(GeminiClient, 'TTS_CACHE_SIZE', 2)
+    client = GeminiClient()
+    calls = mock_gemini_client.models.generate_content
+
+    assert client._generate_tts("Yes.", "Puck") == b"fake_audio_bytes"
+    client._generate_tts("Yes.", "Puck")
+    assert calls.call_count == 1
+
+    # Another voice is another entry; the oldest entry is evicted past TTS_CACHE_SIZE
+    client._generate_tts("Yes.", "Kore")
+    client._generate_tts("No.", "Kore")
+    assert calls.call_count == 3
+    client._generate_tts("Yes.", "Puck")
+    assert calls.call_count == 4
+
+    # Long texts are not kept
+    long_text = "word " * 100
+    client._generate_tts(long_text, "Kore")
+    client._generate_tts(long_text, "Kore")
+    assert calls.call_count == 6
+
+
+def test_generate_tts_kore_fallback_not_memoized_for_failed_voice(mock_gemini_client):
+    """Speech from the Kore fallback is not reused for the voice that failed."""
+    client = GeminiClient()
+
+    def request_tts(text, voice_name):
+        if voice_name == "Puck":
+            raise ValueError("voice rejected")
+        return f"{voice_name}:{text}".encode()
+
+    with patch.object(client, "_request_tts", side_effect=request_tts) as mock_request:
+        assert client._generate_tts("Yes.", "Puck") == b"Kore:Yes."
+        assert client._generate_tts("Yes.", "Puck") == b"Kore:Yes."
+
+    # Puck is tried again every time; the Kore speech itself is reused
+    assert [c.args for c in mock_request.call_args_list] == [("Yes.", "Puck"), ("Yes.", "Kore"), ("Yes.", "Puck")]
+    assert ("Puck", "Yes.") not in client._tts_cache
@@ -2,10 +2,12 @@ import pytest
 from unittest.mock import MagicMock, patch
 import json
 import io
+import time
 from pydub import AudioSegment
 from speech_translator.core.gemini import GeminiClient
 from speech_translator.config import Config
 
+
 @pytest.fixture
 def mock_gemini_client(mocker):
     # Mock Config
@@ -20,61 +22,64 @@ def mock_gemini_client(mocker):
         client.client = MockClient.return_value
         yield client
 
-def test_translate_audio_dialogue_mode(mock_gemini_client):
-    # Mock input audio file
-    with patch("builtins.open", new_callable=MagicMock) as mock_open:
-        mock_file = MagicMock()
-        mock_file.read.return_value = b"fake_audio_bytes"
-        mock_open.return_value.__enter__.return_value = mock_file
-        
-        # Mock Response 1 (Thinking Model - Diarization)
-        mock_response_1 = MagicMock()
-        mock_response_1.text = json.dumps({
-            "segments": [
-                {"speaker": "A", "category": "Man", "text": "Hello.", "approx_duration_ratio": 0.5},
-                {"speaker": "B", "category": "Woman", "text": "Hi there.", "approx_duration_ratio": 0.5}
-            ]
-        })
-        
-        # Mock Response 2 (TTS) - We expect 2 calls
-        mock_response_tts = MagicMock()
-        mock_part = MagicMock()
-        # Mocking Raw PCM data (random bytes)
-        # 1 second of 24k 16bit mono = 48000 bytes
-        mock_part.inline_data.data = b"\x00\x00" * 24000 
-        mock_response_tts.candidates = [MagicMock(content=MagicMock(parts=[mock_part]))]
-        
-        mock_gemini_client.client.models.generate_content.side_effect = [
-            mock_response_1, # Diarization
-            mock_response_tts, # TTS 1
-            mock_response_tts  # TTS 2
+
+def test_translate_audio_dialogue_mode(mock_gemini_client, tmp_path):
+    # Input audio file
+    audio_file = tmp_path / "dummy_path.mp3"
+    audio_file.write_bytes(b"fake_audio_bytes")
+
+    # Mock Response 1 (Thinking Model - Diarization)
+    mock_response_1 = MagicMock()
+    mock_response_1.text = json.dumps({
+        "segments": [
+            {"speaker": "A", "category": "Man", "text": "Hello.", "approx_duration_ratio": 0.5},
+            {"speaker": "B", "category": "Woman", "text": "Hi there.", "approx_duration_ratio": 0.5}
+        ]
+    })
+
+    # Mock Response 2 (TTS) - We expect 2 calls
+    mock_response_tts = MagicMock()
+    mock_part = MagicMock()
+    # Mocking Raw PCM data (random bytes)
+    # 1 second of 24k 16bit mono = 48000 bytes
+    mock_part.inline_data.data = b"\x00\x00" * 24000
+    mock_response_tts.candidates = [MagicMock(content=MagicMock(parts=[mock_part]))]
+
+    mock_gemini_client.client.models.generate_content.side_effect = [
+        mock_response_1,  # Diarization
+        mock_response_tts,  # TTS 1
+        mock_response_tts  # TTS 2
+    ]
+
+    # Use real AudioSegment for this test to match usage of _load_audio_bytes
+    # But we need to avoid pydub trying to actually use ffmpeg if not installed in mocked env?
+    # The new code uses AudioSegment(data=...) which doesn't need ffmpeg for Raw PCM.
+    # But export() does need ffmpeg or pydub internal encoder.
+    # Let's mock AudioSegment again but allow the constructor logic or just mock _load_audio_bytes?
+    # Actually better to integration test the logic in _load_audio_bytes.
+
+    # Mock AudioSegment export to avoid ffmpeg call
+    with patch.object(AudioSegment, 'export', autospec=True) as mock_export:
+        mock_export.return_value = None  # Just to avoid error
+
+        mock_gemini_client.translate_audio(
+            str(audio_file),
+            "English",
+            duration_hint_sec=10.0,
+            mode="dialogue"
+        )
+        # Two voices are spoken by a single multi-speaker TTS request
+        assert mock_gemini_client.client.models.generate_content.call_count == 2
+        tts_call = mock_gemini_client.client.models.generate_content.call_args
+        assert tts_call.kwargs['contents'][0].parts[0].text.endswith("Speaker1: Hello.\nSpeaker2: Hi there.")
+        speakers = tts_call.kwargs['config'].speech_config.multi_speaker_voice_config.speaker_voice_configs
+        assert [(s.speaker, s.voice_config.prebuilt_voice_config.voice_name) for s in speakers] == [
+            ("Speaker1", "Fenrir"), ("Speaker2", "Kore")
         ]
+        # The raw PCM is wrapped as-is: 1 second of 24kHz mono
+        exported = mock_export.call_args.args[0]
+        assert (exported.frame_rate, exported.channels, len(exported)) == (24000, 1, 1000)
 
-        # Use real AudioSegment for this test to match usage of _load_audio_bytes
-        # But we need to avoid pydub trying to actually use ffmpeg if not installed in mocked env?
-        # The new code uses AudioSegment(data=...) which doesn't need ffmpeg for Raw PCM.
-        # But export() does need ffmpeg or pydub internal encoder.
-        # Let's mock AudioSegment again but allow the constructor logic or just mock _load_audio_bytes?
-        # Actually better to integration test the logic in _load_audio_bytes.
-        
-        # Mock AudioSegment export to avoid ffmpeg call
-        with patch.object(AudioSegment, 'export') as mock_export:
-             mock_export.return_value = None # Just to avoid error
-             
-             # Mock _load_audio_bytes to return a mock segment
-             with patch.object(mock_gemini_client, '_load_audio_bytes') as mock_load:
-                 mock_segment = MagicMock()
-                 # Make sure += works (returns self)
-                 mock_segment.__add__.return_value = mock_segment
-                 mock_load.return_value = mock_segment
-                 
-                 mock_gemini_client.translate_audio(
-                    "dummy_path.mp3", 
-                    "English", 
-                    duration_hint_sec=10.0, 
-                    mode="dialogue"
-                )
-                 assert mock_load.call_count == 2
 
 def test_get_voice_for_category(mock_gemini_client):
     assert mock_gemini_client._get_voice_for_category("Young Man") == "Puck"
@@ -84,28 +89,160 @@ def test_get_voice_for_category(mock_gemini_client):
     assert mock_gemini_client._get_voice_for_category("Woman") == "Kore"
     assert mock_gemini_client._get_voice_for_category("Unknown") == "Kore"
 
-def test_process_dialogue_no_segments_fallback(mock_gemini_client):
+
+def test_process_dialogue_no_segments_fallback(mock_gemini_client, tmp_path):
     # Scenario: Model returns valid JSON but empty segments list
-    with patch("builtins.open", new_callable=MagicMock) as mock_open:
-        mock_file = MagicMock()
-        mock_file.read.return_value = b"fake_audio_bytes"
-        mock_open.return_value.__enter__.return_value = mock_file
-        
-        mock_response_1 = MagicMock()
-        mock_response_1.text = json.dumps({"segments": []})
-        
-        mock_response_tts = MagicMock()
-        mock_part = MagicMock()
-        mock_part.inline_data.data = b"fallback_audio"
-        mock_response_tts.candidates = [MagicMock(content=MagicMock(parts=[mock_part]))]
-        
-        mock_gemini_client.client.models.generate_content.side_effect = [
-            mock_response_1, 
-            mock_response_tts
-        ]
+    audio_file = tmp_path / "path"
+    audio_file.write_bytes(b"fake_audio_bytes")
 
-        result = mock_gemini_client.translate_audio("path", "En", mode="dialogue", duration_hint_sec=10.0)
-        
-        # Should call generate_content twice (1 analysis, 1 fallback TTS)
-        assert mock_gemini_client.client.models.generate_content.call_count == 2
-        assert result == b"fallback_audio"
+    mock_response_1 = MagicMock()
+    mock_response_1.text = json.dumps({"segments": []})
+
+    mock_response_tts = MagicMock()
+    mock_part = MagicMock()
+    mock_part.inline_data.data = b"fallback_audio"
+    mock_response_tts.candidates = [MagicMock(content=MagicMock(parts=[mock_part]))]
+
+    mock_gemini_client.client.models.generate_content.side_effect = [
+        mock_response_1,
+        mock_response_tts
+    ]
+
+    result = mock_gemini_client.translate_audio(str(audio_file), "En", mode="dialogue", duration_hint_sec=10.0)
+
+    # Should call generate_content twice (1 analysis, 1 fallback TTS)
+    assert mock_gemini_client.client.models.generate_content.call_count == 2
+    assert result == b"fallback_audio"
+
+
+def test_translate_audio_dialogue_cache_hit(mock_gemini_client):
+    """Identical audio with identical settings is served from the disk cache."""
+    mock_response_1 = MagicMock()
+    mock_response_1.text = json.dumps({"segments": [{"speaker": "A", "category": "Man", "text": "Hello."}]})
+    generate_content = mock_gemini_client.client.models.generate_content
+    generate_content.return_value = mock_response_1
+
+    with patch.object(mock_gemini_client, '_generate_tts', return_value=b"\x00\x00"), \
+         patch.object(AudioSegment, 'export', side_effect=lambda buffer, format: buffer.write(b"dialogue_audio")):
+        first = mock_gemini_client.translate_audio_bytes(b"same_audio", "English", 10.0, mode="dialogue")
+        second = mock_gemini_client.translate_audio_bytes(b"same_audio", "English", 10.0, mode="dialogue")
+
+    assert first == second == b"dialogue_audio"
+    assert generate_content.call_count == 1
+
+
+def test_translate_audio_dialogue_fallbacks_not_cached(mock_gemini_client):
+    """Audio with dropped turns, or spoken without any segments, is not kept in the disk cache."""
+    mock_response_1 = MagicMock()
+    mock_response_1.text = json.dumps({"segments": [{"speaker": "A", "category": "Man", "text": "Hello."}]})
+    generate_content = mock_gemini_client.client.models.generate_content
+    generate_content.return_value = mock_response_1
+
+    with patch.object(mock_gemini_client, '_generate_tts', return_value=b"\x00\x00"), \
+         patch.object(mock_gemini_client, '_segment_pcm', side_effect=ValueError("bad audio")), \
+         patch.object(AudioSegment, 'export'):
+        mock_gemini_client.translate_audio_bytes(b"audio", "English", duration_hint_sec=10.0, mode="dialogue")
+        mock_gemini_client.translate_audio_bytes(b"audio", "English", duration_hint_sec=10.0, mode="dialogue")
+    assert generate_content.call_count == 2
+
+    mock_response_1.text = json.dumps({"segments": []})
+    with patch.object(mock_gemini_client, '_generate_tts', return_value=b"fallback_audio"):
+        mock_gemini_client.translate_audio_bytes(b"other", "English", duration_hint_sec=10.0, mode="dialogue")
+        mock_gemini_client.translate_audio_bytes(b"other", "English", duration_hint_sec=10.0, mode="dialogue")
+    assert generate_content.call_count == 4
+
+
+def test_process_dialogue_generates_segments_concurrently_in_order(mock_gemini_client, mocker):
+    mocker.patch.object(Config, 'TTS_RPM', 0)
+    categories = ["Man", "Woman", "Young Man", "Woman"]
+    segments = [{"speaker": str(i), "category": c, "text": f"Line {i}."} for i, c in enumerate(categories)]
+    mock_response = MagicMock()
+    mock_response.text = json.dumps({"segments": segments})
+    mock_gemini_client.client.models.generate_content.return_value = mock_response
+
+    def slow_tts(text, voice):
+        # Earlier segments finish last
+        time.sleep(0.05 * (4 - int(text.split()[1][0])))
+        return text.encode()
+
+    with patch.object(mock_gemini_client, '_generate_tts', side_effect=slow_tts), \
+         patch.object(mock_gemini_client, '_segment_pcm', return_value=b"") as mock_load, \
+         patch.object(AudioSegment, 'export'):
+        started = time.monotonic()
+        mock_gemini_client._process_dialogue(b"audio", "English", None)
+        elapsed = time.monotonic() - started
+
+    assert [c.args[0] for c in mock_load.call_args_list] == [f"Line {i}.".encode() for i in range(4)]
+    # Sequential would take 0.5s
+    assert elapsed < 0.4
+
+
+def test_voice_runs_merge_consecutive_segments():
+    jobs = [("Hi.", "Puck"), ("How are you?", "Puck"), ("Fine.", "Kore"), ("Good.", "Puck")]
+    assert GeminiClient._voice_runs(jobs) == [
+        ("Hi.\nHow are you?", "Puck"), ("Fine.", "Kore"), ("Good.", "Puck")
+    ]
+
+
+def test_process_dialogue_multi_speaker_failure_falls_back_to_turns(mock_gemini_client):
+    segments = [
+        {"speaker": "A", "category": "Man", "text": "Hello."},
+        {"speaker": "A", "category": "Man", "text": "Anyone here?"},
+        {"speaker": "B", "category": "Woman", "text": "Hi there."},
+    ]
+    mock_response = MagicMock()
+    mock_response.text = json.dumps({"segments": segments})
+    mock_gemini_client.client.models.generate_content.return_value = mock_response
+
+    with patch.object(mock_gemini_client, '_generate_multi_speaker_tts', side_effect=ValueError("blocked")), \
+         patch.object(mock_gemini_client, '_generate_tts', return_value=b"pcm") as mock_tts, \
+         patch.object(mock_gemini_client, '_segment_pcm', return_value=b""), \
+         patch.object(AudioSegment, 'export'):
+        mock_gemini_client._process_dialogue(b"audio", "English", None)
+
+    assert sorted(c.args for c in mock_tts.call_args_list) == [
+        ("Hello.\nAnyone here?", "Fenrir"), ("Hi there.", "Kore")
+    ]
+
+
+def test_segment_pcm_passes_raw_pcm_and_converts_wav(mock_gemini_client):
+    raw = b"\x01\x00" * 240
+    assert mock_gemini_client._segment_pcm(raw) is raw
+
+    stereo_16k = AudioSegment(data=b"\x00\x10" * 3200, sample_width=2, frame_rate=16000, channels=2)
+    wav = io.BytesIO()
+    stereo_16k.export(wav, format="wav")
+    pcm = mock_gemini_client._segment_pcm(wav.getvalue())
+    # ~100 ms of 24kHz 16-bit mono (resampling may drop a frame)
+    assert len(pcm) % 2 == 0
+    assert 4790 <= len(pcm) <= 4800
+
+    with pytest.raises(ValueError):
+        mock_gemini_client._segment_pcm(b"\x00\x00\x00")
+
+
+@pytest.mark.parametrize("category, voice", [
+    ("Boy", "Puck"), ("Deep voiced man", "Charon"), ("Girl", "Aoede"), ("Elderly Woman", "Kore"),
+    ("Female", "Kore"), ("Male", "Fenrir"), ("Elderly", "Kore"), ("", "Kore"),
+])
+def test_get_voice_for_category_keywords(mock_gemini_client, category, voice):
+    assert mock_gemini_client._get_voice_for_category(category) == voice
+
+
+def test_process_dialogue_uses_structured_output(mock_gemini_client):
+    """Diarization requests the DialogueResult schema and reads response.parsed without reparsing text."""
+    from speech_translator.core.gemini import DialogueResult, DialogueSegment
+    mock_response = MagicMock()
+    mock_response.parsed = DialogueResult(segments=[
+        DialogueSegment(speaker="A", category="Girl", text="Hi!")
+    ])
+    mock_response.text = "not json"
+    mock_gemini_client.client.models.generate_content.return_value = mock_response
+
+    with patch.object(mock_gemini_client, '_generate_tts', return_value=b"\x00\x00") as mock_tts, \
+         patch.object(AudioSegment, 'export'):
+        mock_gemini_client._process_dialogue(b"audio", "English", None)
+
+    config = mock_gemini_client.client.models.generate_content.call_args.kwargs['config']
+    assert config.response_schema is DialogueResult
+    mock_tts.assert_called_once_with("Hi!", "Aoede")
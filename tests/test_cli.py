@@ -5,9 +5,10 @@ from speech_translator.cli import app
 
 runner = CliRunner()
 
+
 class TestCLI:
     
-    @patch("speech_translator.cli.TranslationOrchestrator")
+    @patch("speech_translator.orchestrator.TranslationOrchestrator")
     def test_translate_command(self, mock_orchestrator):
         """Test the main translation command."""
         mock_instance = mock_orchestrator.return_value
@@ -21,7 +22,29 @@ class TestCLI:
         assert kwargs['output_path'] == "output.mp3"
         assert kwargs['target_lang'] == "German"
 
-    @patch("speech_translator.cli.GeminiClient")
+    @patch("speech_translator.orchestrator.TranslationOrchestrator")
+    def test_translate_default_output_path(self, mock_orchestrator):
+        """Output path is inferred from the input when not provided."""
+        mock_instance = mock_orchestrator.return_value
+
+        result = runner.invoke(app, ["translate", "clip.MKV", "--lang", "German"])
+        assert result.exit_code == 0
+        assert mock_instance.process.call_args.kwargs['output_path'] == "clip_translated.mp4"
+
+        result = runner.invoke(app, ["translate", "HTTPS://youtu.be/x", "--lang", "German"])
+        assert result.exit_code == 0
+        assert mock_instance.process.call_args.kwargs['output_path'] == "downloaded_video_translated.mp4"
+
+    def test_help_skips_validation(self):
+        """--help neither validates the config nor needs an API key."""
+        with patch("speech_translator.cli.Config.validate") as mock_validate:
+            result = runner.invoke(app, ["translate", "--help"])
+
+        assert result.exit_code == 0
+        assert "--lang" in result.stdout
+        mock_validate.assert_not_called()
+
+    @patch("speech_translator.core.gemini.GeminiClient")
     def test_list_models_command(self, mock_client):
         """Test the list-models command."""
         mock_instance = mock_client.return_value
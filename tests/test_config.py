@@ -3,6 +3,7 @@ import os
 from unittest.mock import patch
 from speech_translator.config import Config
 
+
 class TestConfig:
     
     def test_validate_missing_key(self):
@@ -24,3 +25,11 @@ class TestConfig:
                 Config.validate()
             except ValueError:
                 pytest.fail("Config.validate() raised ValueError unexpectedly")
+
+    def test_ensure_temp_dir(self, tmp_path):
+        """Temp dir is created lazily, including missing parents."""
+        temp_dir = tmp_path / "nested" / "temp_audio"
+        with patch.object(Config, 'TEMP_DIR', temp_dir):
+            assert not temp_dir.exists()
+            assert Config.ensure_temp_dir() == temp_dir
+            assert temp_dir.is_dir()
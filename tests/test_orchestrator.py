@@ -1,8 +1,11 @@
 import pytest
+import speech_translator.orchestrator
 from unittest.mock import MagicMock, call, patch, ANY
 from speech_translator.orchestrator import TranslationOrchestrator
 from speech_translator.config import Config
 from pathlib import Path
+from threading import Event
+
 
 class TestOrchestrator:
 
@@ -18,10 +21,13 @@ class TestOrchestrator:
             mock_ap_instance = mock_ap_class.return_value
             # Setup common mock returns
             mock_ap_instance.load_audio.return_value = mock_audio_processor
+            mock_ap_instance.encode_audio.return_value = b"chunk_mp3"
+            mock_ap_instance.load_audio_bytes.return_value = mock_audio_processor
             mock_ap_instance.detect_speech_intervals.return_value = [
                 {'audio': mock_audio_processor, 'start': 0, 'end': 5000}
             ]
             mock_ap_instance.trim_silence.return_value = mock_audio_processor
+            mock_ap_instance.is_silent.return_value = False
             mock_ap_instance.speed_match.return_value = mock_audio_processor
             mock_ap_instance.apply_ducking.return_value = mock_audio_processor
             
@@ -38,7 +44,7 @@ class TestOrchestrator:
         output_file = tmp_path / "output.mp4"
         
         # Mock translate response
-        mock_gemini_client.translate_audio.return_value = b"RIFF_fake_wav_header"
+        mock_gemini_client.translate_audio_bytes.return_value = b"RIFF_fake_wav_header"
         
         orchestrator.process(str(input_file), str(output_file), "Spanish", ducking=True)
         
@@ -46,17 +52,25 @@ class TestOrchestrator:
         orchestrator.audio_processor.load_audio.assert_called()
         
         # Verify Translation Called
-        mock_gemini_client.translate_audio.assert_called()
+        mock_gemini_client.translate_audio_bytes.assert_called()
         
-        # Verify Ducking Applied
+        # Verify Ducking Applied, on a voice track built in the original's format
         orchestrator.audio_processor.apply_ducking.assert_called()
+        like = orchestrator.audio_processor.overlay_segments.call_args.kwargs["like"]
+        assert like is orchestrator.audio_processor.load_audio.return_value
         
         # Verify Video Merge
         orchestrator.audio_processor.merge_video_audio.assert_called_with(
             video_path=str(input_file),
-            audio_path=ANY,
-            output_path=str(output_file)
+            audio_path=None,
+            output_path=str(output_file),
+            audio_data=orchestrator.audio_processor.encode_audio.return_value
+        )
+        orchestrator.audio_processor.encode_audio.assert_called_with(
+            orchestrator.audio_processor.apply_ducking.return_value, format="wav"
         )
+        # Nothing was written to the temp dir on the way
+        assert not Config.TEMP_DIR.exists() or not any(Config.TEMP_DIR.iterdir())
 
     def test_process_flow_audio_only(self, orchestrator, mock_gemini_client, tmp_path):
         """Test flow for audio-only export."""
@@ -64,12 +78,15 @@ class TestOrchestrator:
         input_file.touch()
         output_file = tmp_path / "output.mp3"
         
-        mock_gemini_client.translate_audio.return_value = b"fake_mp3_data"
+        mock_gemini_client.translate_audio_bytes.return_value = b"fake_mp3_data"
         
         orchestrator.process(str(input_file), str(output_file), "French", ducking=False)
         
         # Verify Save Audio called instead of merge video
-        orchestrator.audio_processor.save_audio.assert_called_with(ANY, str(output_file))
+        orchestrator.audio_processor.save_audio.assert_called_with(
+            orchestrator.audio_processor.overlay_segments.return_value, str(output_file)
+        )
+        orchestrator.audio_processor.apply_ducking.assert_not_called()
         orchestrator.audio_processor.merge_video_audio.assert_not_called()
 
     def test_process_retry_logic(self, orchestrator, mock_gemini_client, tmp_path):
@@ -78,7 +95,7 @@ class TestOrchestrator:
         input_file.touch()
         
         # First call fails, second succeeds
-        mock_gemini_client.translate_audio.side_effect = [
+        mock_gemini_client.translate_audio_bytes.side_effect = [
             Exception("429 Rate Limit"),
             b"success_audio"
         ]
@@ -86,9 +103,69 @@ class TestOrchestrator:
         with patch("time.sleep") as mock_sleep: # Don't actually sleep
             orchestrator.process(str(input_file), str(tmp_path/"out.mp3"), "En")
             
-            assert mock_gemini_client.translate_audio.call_count == 2
+            assert mock_gemini_client.translate_audio_bytes.call_count == 2
             mock_sleep.assert_called()
 
+    def test_process_retry_backs_off_exponentially(self, orchestrator, mock_gemini_client, tmp_path):
+        """Without a server hint, rate-limit retries wait 30s then 60s (each with +-20% jitter)."""
+        input_file = tmp_path / "input.mp3"
+        input_file.touch()
+        mock_gemini_client.translate_audio_bytes.side_effect = [
+            Exception("429 Rate Limit"),
+            Exception("429 Rate Limit"),
+            b"success_audio"
+        ]
+
+        with patch("speech_translator.orchestrator.time.sleep") as mock_sleep, \
+             patch("speech_translator.orchestrator.random.uniform", side_effect=[1.2, 0.8]):
+            orchestrator.process(str(input_file), str(tmp_path/"out.mp3"), "En")
+
+        assert [c.args[0] for c in mock_sleep.call_args_list] == [pytest.approx(36.0), pytest.approx(48.0)]
+
+    def test_process_retry_honors_server_delay(self, orchestrator, mock_gemini_client, tmp_path):
+        """A rate-limit error that names its retry delay is retried after that delay, not the default."""
+        input_file = tmp_path / "input.mp3"
+        input_file.touch()
+        mock_gemini_client.translate_audio_bytes.side_effect = [
+            Exception("429 RESOURCE_EXHAUSTED. Please retry in 3.5s."),
+            b"success_audio"
+        ]
+
+        with patch("speech_translator.orchestrator.time.sleep") as mock_sleep:
+            orchestrator.process(str(input_file), str(tmp_path/"out.mp3"), "En")
+
+        mock_sleep.assert_called_once_with(3.5)
+
+    def test_process_retries_other_errors_quickly(self, orchestrator, mock_gemini_client, tmp_path):
+        """Failures other than rate limits are retried after a short, doubling delay."""
+        input_file = tmp_path / "input.mp3"
+        input_file.touch()
+        mock_gemini_client.translate_audio_bytes.side_effect = [
+            ValueError("No audio data in TTS response"),
+            ValueError("No audio data in TTS response"),
+            b"success_audio"
+        ]
+
+        with patch("speech_translator.orchestrator.time.sleep") as mock_sleep:
+            orchestrator.process(str(input_file), str(tmp_path/"out.mp3"), "En")
+
+        assert mock_gemini_client.translate_audio_bytes.call_count == 3
+        assert mock_sleep.call_args_list == [call(0.5), call(1.0)]
+
+    def test_process_does_not_retry_fatal_errors(self, orchestrator, mock_gemini_client, tmp_path):
+        """A client error such as an invalid argument fails the chunk at once."""
+        from google.genai import errors
+        input_file = tmp_path / "input.mp3"
+        input_file.touch()
+        mock_gemini_client.translate_audio_bytes.side_effect = errors.ClientError(400, {"error": {"code": 400}})
+
+        with patch("speech_translator.orchestrator.time.sleep") as mock_sleep:
+            orchestrator.process(str(input_file), str(tmp_path/"out.mp3"), "En")
+
+        assert mock_gemini_client.translate_audio_bytes.call_count == 1
+        mock_sleep.assert_not_called()
+        speech_translator.orchestrator.AudioSegment.silent.assert_called_once()
+
     def test_process_url_download(self, orchestrator, tmp_path):
         """Test handling of URL inputs."""
         url = "http://example.com/video.mp4"
@@ -101,4 +178,146 @@ class TestOrchestrator:
             
             orchestrator.process(url, output, "En")
             
-            mock_dl.assert_called_with(url, ANY, prefer_video=True)
+            mock_dl.assert_called_with(url, Config.TEMP_DIR, prefer_video=True)
+
+    def test_process_url_audio_output_streams_without_download(self, orchestrator, mock_audio_processor, tmp_path):
+        """For audio-only output the URL's audio is decoded from its stream, with no temp file."""
+        url = "https://example.com/watch?v=abc"
+        stream = {
+            'url': "https://cdn.example.com/audio", 'asr': 44100, 'audio_channels': 1,
+            'http_headers': {"User-Agent": "x"}
+        }
+        orchestrator.audio_processor.load_audio_stream.return_value = mock_audio_processor
+
+        with patch("speech_translator.orchestrator.resolve_audio_stream", return_value=stream), \
+             patch("speech_translator.orchestrator.download_content") as mock_dl:
+            orchestrator.process(url, str(tmp_path / "out.mp3"), "En")
+
+        mock_dl.assert_not_called()
+        orchestrator.audio_processor.load_audio_stream.assert_called_once_with(
+            "https://cdn.example.com/audio", frame_rate=44100, channels=1, headers={"User-Agent": "x"}
+        )
+        orchestrator.audio_processor.load_audio.assert_not_called()
+
+    def test_process_url_audio_output_falls_back_to_download(self, orchestrator, tmp_path):
+        url = "https://example.com/watch?v=abc"
+        (tmp_path / "downloaded.m4a").touch()
+
+        with patch("speech_translator.orchestrator.resolve_audio_stream", side_effect=ValueError("fragmented")), \
+             patch("speech_translator.orchestrator.download_content",
+                   return_value=tmp_path / "downloaded.m4a") as mock_dl:
+            orchestrator.process(url, str(tmp_path / "out.mp3"), "En")
+
+        mock_dl.assert_called_with(url, Config.TEMP_DIR, prefer_video=False)
+        orchestrator.audio_processor.load_audio.assert_called_once_with(str(tmp_path / "downloaded.m4a"))
+
+    def test_process_chunk_duration_comes_from_interval(self, orchestrator, mock_gemini_client, mock_audio_processor,
+                                                        tmp_path):
+        """The duration hint is taken from the interval bounds, not measured from the audio."""
+        input_file = tmp_path / "input.mp3"
+        input_file.touch()
+        orchestrator.audio_processor.detect_speech_intervals.return_value = [
+            {'audio': mock_audio_processor, 'start': 1000, 'end': 4500}
+        ]
+
+        orchestrator.process(str(input_file), str(tmp_path / "out.mp3"), "En")
+
+        assert mock_gemini_client.translate_audio_bytes.call_args.kwargs["duration_hint_sec"] == 3.5
+
+    def test_process_concurrent_chunks_keep_order(self, orchestrator, mock_gemini_client, mock_audio_processor,
+                                                  tmp_path):
+        """Chunks are translated concurrently but placed on the timeline in order."""
+        input_file = tmp_path / "input.mp3"
+        input_file.touch()
+        starts = (0, 5000, 10000)
+        orchestrator.audio_processor.detect_speech_intervals.return_value = [
+            {'audio': MagicMock(raw_data=f"pcm{k}".encode()), 'start': start, 'end': start + 5000}
+            for k, start in enumerate(starts)
+        ]
+        orchestrator.audio_processor.encode_audio.side_effect = lambda chunk, format: chunk.raw_data
+        translated = {}
+        for k in range(len(starts)):
+            translated[f"tts{k}".encode()] = MagicMock(name=f"translated{k}")
+            translated[f"tts{k}".encode()].__len__.return_value = 5000
+        orchestrator.audio_processor.load_audio_bytes.side_effect = translated.get
+        orchestrator.audio_processor.trim_silence.side_effect = lambda segment: segment
+
+        # Each chunk only finishes after the chunk behind it, so they complete last-to-first
+        finished = [Event() for _ in starts]
+        completion_order = []
+
+        def translate_after_next_chunk(chunk_bytes, *args, **kwargs):
+            k = int(chunk_bytes[len(b"pcm"):])
+            if k + 1 < len(starts):
+                assert finished[k + 1].wait(timeout=5)
+            completion_order.append(k)
+            finished[k].set()
+            return f"tts{k}".encode()
+
+        mock_gemini_client.translate_audio_bytes.side_effect = translate_after_next_chunk
+
+        with patch.object(Config, "TRANSLATION_CONCURRENCY", 3):
+            orchestrator.process(str(input_file), str(tmp_path / "out.mp3"), "En")
+
+        assert completion_order == [2, 1, 0]
+        placements = orchestrator.audio_processor.overlay_segments.call_args.args[1]
+        assert placements == [(translated[f"tts{k}".encode()], start) for k, start in enumerate(starts)]
+
+    def test_process_does_not_print_debug_output(self, orchestrator, mock_gemini_client, tmp_path, capsys):
+        """Per-chunk diagnostics go through logging, not flushed stdout writes."""
+        input_file = tmp_path / "input.mp3"
+        input_file.touch()
+        mock_gemini_client.translate_audio_bytes.return_value = b"RIFF_fake_wav_header"
+
+        orchestrator.process(str(input_file), str(tmp_path / "out.mp3"), "En")
+
+        assert "DEBUG" not in capsys.readouterr().out
+
+    def test_process_skips_silent_chunks(self, orchestrator, mock_gemini_client, mock_audio_processor, tmp_path):
+        """Near-silent chunks become silence on the timeline without any Gemini call."""
+        input_file = tmp_path / "input.mp3"
+        input_file.touch()
+        orchestrator.audio_processor.is_silent.return_value = True
+        orchestrator.audio_processor._dbfs.return_value = -40.0
+
+        orchestrator.process(str(input_file), str(tmp_path / "out.mp3"), "En")
+
+        mock_gemini_client.translate_audio_bytes.assert_not_called()
+        # Thresholds follow the track's loudness (measured once, memoized) instead of fixed dBFS values
+        orchestrator.audio_processor._dbfs.assert_called_once_with(mock_audio_processor)
+        orchestrator.audio_processor.is_silent.assert_called_once_with(
+            mock_audio_processor,
+            -40.0 + Config.SILENT_CHUNK_OFFSET_DB,
+            -40.0 + Config.SILENT_CHUNK_PEAK_OFFSET_DB
+        )
+        # Silence is built at the TTS rate, so mixing it needs no resampling
+        speech_translator.orchestrator.AudioSegment.silent.assert_called_once_with(duration=ANY, frame_rate=24000)
+        orchestrator.audio_processor.save_audio.assert_called_with(ANY, str(tmp_path / "out.mp3"))
+
+    def test_process_keeps_chunk_audio_in_memory(self, orchestrator, mock_gemini_client, mock_audio_processor,
+                                                 tmp_path):
+        """Chunks are encoded and decoded in memory instead of through temp files."""
+        input_file = tmp_path / "input.mp3"
+        input_file.touch()
+        mock_gemini_client.translate_audio_bytes.return_value = b"\x00\x01" * 100
+
+        with patch.object(Config, "UPLOAD_AUDIO_CODEC", "opus"):
+            orchestrator.process(str(input_file), str(tmp_path / "out.mp3"), "En")
+
+        orchestrator.audio_processor.encode_audio.assert_called_once_with(mock_audio_processor, format="wav")
+        assert mock_gemini_client.translate_audio_bytes.call_args.args[0] == b"chunk_mp3"
+        cache_source = mock_gemini_client.translate_audio_bytes.call_args.kwargs["cache_source"]
+        assert cache_source is mock_audio_processor.raw_data
+        orchestrator.audio_processor.load_audio_bytes.assert_called_once_with(b"\x00\x01" * 100)
+        assert not list(Config.TEMP_DIR.glob("*chunk*"))
+
+    def test_process_sends_mp3_when_reencoding_is_disabled(self, orchestrator, mock_gemini_client, mock_audio_processor,
+                                                           tmp_path):
+        """Without the recognition re-encode, chunks go to Gemini as compact MP3 instead of WAV."""
+        input_file = tmp_path / "input.mp3"
+        input_file.touch()
+
+        with patch.object(Config, "UPLOAD_AUDIO_CODEC", "original"):
+            orchestrator.process(str(input_file), str(tmp_path / "out.mp3"), "En")
+
+        orchestrator.audio_processor.encode_audio.assert_called_once_with(mock_audio_processor, format="mp3")